@@ -3,27 +3,26 @@ from pathlib import Path
 import lightbulb
 import hikari
 import dotenv
-from utils.db import session, Problem as Problem_DB
-from utils.query import Query
-import asyncio
+from utils import api
+from utils.api import SharedRateLimiter
+from utils.db import engine
+from utils.gateway import gateway_profile
+from utils.constants import SHARD_COUNT, SHARD_PROCESSES, API_RATE_LIMIT, API_CONCURRENCY_LIMIT
+import multiprocessing
 import logging
+import time
 
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=logging.INFO, format="%(processName)s %(levelname)s:%(name)s:%(message)s")
 logger = logging.getLogger(__name__)
 
+# Discord allows one identify every 5 seconds
+IDENTIFY_INTERVAL = 5
 
-def main():
-    # https://github.com/cheran-senthil/TLE/blob/bae59c2de6a2313be4a6ba4a5a5cbba81352e229/tle/__main__.py
-    dotenv.load_dotenv()
-    BOT_TOKEN = os.environ.get("JOMD_BOT_TOKEN")
-
-    if not BOT_TOKEN:
-        logger.critical("Missing bot token")
-        return
 
+def create_bot(token: str) -> lightbulb.BotApp:
     pref = "+"
-    bot = lightbulb.BotApp(
-        token=BOT_TOKEN, prefix=pref, banner=None, intents=hikari.Intents.ALL)
+    intents, cache_settings = gateway_profile()
+    bot = lightbulb.BotApp(token=token, prefix=pref, banner=None, intents=intents, cache_settings=cache_settings)
 
     bot.load_extensions_from("./extensions/")
     # TESTING
@@ -32,16 +31,64 @@ def main():
     #     bot.load_extensions(f"extensions.{extension}")
     logger.debug("Extensions loaded: %s", ", ".join(bot.extensions))
 
-    # Get preliminary data
-    if session.query(Problem_DB).count() == 0:
-        q = Query()
-        loop = asyncio.get_event_loop()
-        loop.run_until_complete(q.get_problems())
-
     # Restrict bot usage to inside guild channels only.
     bot.check(lightbulb.checks.guild_only)
+    return bot
+
+
+def run_shards(token: str, shard_ids, shard_count: int, rate_limiter: SharedRateLimiter) -> None:
+    """Worker process, runs shard_ids out of shard_count with the DMOJ rate limit shared with the other workers"""
+    api.rate_limiter = rate_limiter
+    bot = create_bot(token)
+    bot.run(shard_ids=shard_ids, shard_count=shard_count)
+
+
+def launch_shards(token: str) -> None:
+    """Split SHARD_COUNT shards over worker processes so a slow command only holds up its own shards"""
+    processes = SHARD_PROCESSES or min(SHARD_COUNT, os.cpu_count() or 1)
+    groups = [list(range(SHARD_COUNT))[i::processes] for i in range(processes)]
+    if engine.dialect.name == "sqlite":
+        logger.warning("Running %s worker processes against sqlite, set JOMD_DB_URI to a server db", processes)
+
+    context = multiprocessing.get_context("spawn")
+    rate_limiter = SharedRateLimiter(API_RATE_LIMIT, API_CONCURRENCY_LIMIT, context)
+    workers = []
+    for shard_ids in groups:
+        worker = context.Process(
+            target=run_shards,
+            args=(token, shard_ids, SHARD_COUNT, rate_limiter),
+            name="shards-" + ",".join(map(str, shard_ids)),
+        )
+        worker.start()
+        workers.append(worker)
+        logger.info("Started %s", worker.name)
+        # Let this worker identify its shards before the next one starts identifying
+        time.sleep(IDENTIFY_INTERVAL * len(shard_ids))
+
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        # Workers got the same SIGINT and are closing their shards
+        for worker in workers:
+            worker.join()
+
+
+def main():
+    # https://github.com/cheran-senthil/TLE/blob/bae59c2de6a2313be4a6ba4a5a5cbba81352e229/tle/__main__.py
+    dotenv.load_dotenv()
+    BOT_TOKEN = os.environ.get("JOMD_BOT_TOKEN")
+
+    if not BOT_TOKEN:
+        logger.critical("Missing bot token")
+        return
+
+    # Problems are fetched in the background once connected, see utils/bootstrap.py
     # TODO Make something that will automatically fetch recent contests
-    bot.run()
+    if SHARD_COUNT > 1:
+        launch_shards(BOT_TOKEN)
+    else:
+        create_bot(BOT_TOKEN).run()
 
 
 if __name__ == "__main__":
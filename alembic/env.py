@@ -1,4 +1,5 @@
 from logging.config import fileConfig
+import os
 
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
@@ -13,6 +14,10 @@ config = context.config
 # This line sets up loggers basically.
 fileConfig(config.config_file_name)
 
+# JOMD_DB_URI points migrations at the same db as the bot, % is escaped for configparser
+if "JOMD_DB_URI" in os.environ:
+    config.set_main_option("sqlalchemy.url", os.environ["JOMD_DB_URI"].replace("%", "%%"))
+
 # add your model's MetaData object here
 # for 'autogenerate' support
 from utils.db import Base
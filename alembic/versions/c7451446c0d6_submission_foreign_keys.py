@@ -0,0 +1,59 @@
+"""Replace submission association tables with foreign keys
+
+Revision ID: c7451446c0d6
+Revises: 917eaa6ac4e2
+Create Date: 2026-10-19 14:37:52.119204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c7451446c0d6"
+down_revision = "917eaa6ac4e2"
+branch_labels = None
+depends_on = None
+
+# (column, association table, association column, referenced table, referenced column, type)
+LINKS = [
+    ("problem_id", "problem_submission", "problem_id", "problem", "code", sa.String),
+    ("user_id", "submission_user", "user_id", "user", "id", sa.Integer),
+    ("language_id", "language_submission", "language_id", "language", "id", sa.Integer),
+]
+
+
+def upgrade():
+    with op.batch_alter_table("submission") as batch_op:
+        for column, _, _, table, remote, type_ in LINKS:
+            batch_op.add_column(sa.Column(column, type_(), nullable=True))
+            batch_op.create_foreign_key(f"fk_submission_{column}_{table}", table, [column], [remote])
+            batch_op.create_index(op.f(f"ix_submission_{column}"), [column], unique=False)
+
+    for column, association, association_column, _, _, _ in LINKS:
+        op.execute(
+            f"UPDATE submission SET {column} = "
+            f"(SELECT MIN({association_column}) FROM {association} WHERE submission_id = submission.id)"
+        )
+        op.drop_table(association)
+
+
+def downgrade():
+    for column, association, association_column, table, remote, type_ in LINKS:
+        op.create_table(
+            association,
+            sa.Column("submission_id", sa.Integer(), nullable=True),
+            sa.Column(association_column, type_(), nullable=True),
+            sa.ForeignKeyConstraint(["submission_id"], ["submission.id"]),
+            sa.ForeignKeyConstraint([association_column], [f"{table}.{remote}"]),
+        )
+        op.execute(
+            f"INSERT INTO {association} (submission_id, {association_column}) "
+            f"SELECT id, {column} FROM submission WHERE {column} IS NOT NULL"
+        )
+
+    with op.batch_alter_table("submission") as batch_op:
+        for column, _, _, table, _, _ in LINKS:
+            batch_op.drop_index(op.f(f"ix_submission_{column}"))
+            batch_op.drop_constraint(f"fk_submission_{column}_{table}", type_="foreignkey")
+            batch_op.drop_column(column)
@@ -0,0 +1,50 @@
+"""Postgres support: bigint discord ids and GIN indexes on json columns
+
+Revision ID: eae621eb7878
+Revises: c7451446c0d6
+Create Date: 2026-10-19 16:05:23.731840
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "eae621eb7878"
+down_revision = "c7451446c0d6"
+branch_labels = None
+depends_on = None
+
+DISCORD_IDS = [
+    ("handle", "id"),
+    ("handle", "guild_id"),
+    ("gitgud", "guild_id"),
+    ("current_gitgud", "guild_id"),
+]
+
+# (index, table, column, operator class) for json_contains, only created on postgres
+GIN_INDEXES = [
+    ("ix_problem_types", "problem", "types", "jsonb_ops"),
+    ("ix_contest_tags", "contest", "tags", "jsonb_ops"),
+    ("ix_contest_rankings", "contest", "rankings", "jsonb_path_ops"),
+]
+
+
+def upgrade():
+    for table, column in DISCORD_IDS:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(column, type_=sa.BigInteger(), existing_type=sa.Integer())
+
+    if op.get_bind().dialect.name == "postgresql":
+        for index, table, column, ops in GIN_INDEXES:
+            op.create_index(index, table, [column], postgresql_using="gin", postgresql_ops={column: ops})
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        for index, table, _, _ in GIN_INDEXES:
+            op.drop_index(index, table_name=table)
+
+    for table, column in DISCORD_IDS:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(column, type_=sa.Integer(), existing_type=sa.BigInteger())
@@ -0,0 +1,51 @@
+"""Index gitgud lookups and keep a running total of gitgud points
+
+Revision ID: f7c4aaaec484
+Revises: eae621eb7878
+Create Date: 2026-10-19 18:02:41.518204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "f7c4aaaec484"
+down_revision = "eae621eb7878"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_gitgud_handle_guild_id_time", "gitgud", ["handle", "guild_id", "time"]),
+    ("ix_current_gitgud_handle_guild_id", "current_gitgud", ["handle", "guild_id"]),
+]
+
+
+def upgrade():
+    for index, table, columns in INDEXES:
+        op.create_index(index, table, columns)
+
+    score = op.create_table(
+        "gitgud_score",
+        sa.Column("handle", sa.String(), nullable=False),
+        sa.Column("guild_id", sa.BigInteger(), nullable=False),
+        sa.Column("point", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("handle", "guild_id"),
+    )
+    op.create_index("ix_gitgud_score_guild_id_point", "gitgud_score", ["guild_id", "point"])
+
+    gitgud = sa.table("gitgud", sa.column("handle"), sa.column("guild_id"), sa.column("point"))
+    totals = (
+        sa.select([gitgud.c.handle, gitgud.c.guild_id, sa.func.coalesce(sa.func.sum(gitgud.c.point), 0)])
+        .where(gitgud.c.handle.isnot(None))
+        .where(gitgud.c.guild_id.isnot(None))
+        .group_by(gitgud.c.handle, gitgud.c.guild_id)
+    )
+    op.execute(score.insert().from_select(["handle", "guild_id", "point"], totals))
+
+
+def downgrade():
+    op.drop_index("ix_gitgud_score_guild_id_point", table_name="gitgud_score")
+    op.drop_table("gitgud_score")
+    for index, table, _ in INDEXES:
+        op.drop_index(index, table_name=table)
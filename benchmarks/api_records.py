@@ -0,0 +1,55 @@
+"""
+Memory used by the parsed API record classes for a 50k submission history.
+
+Compares the slotted classes in utils.api against the same classes rebuilt with a
+per instance __dict__, which is what they were before __slots__ was added.
+
+    python -m benchmarks.api_records [count]
+"""
+import gc
+import sys
+import time
+import tracemalloc
+from utils.api import Submission
+from benchmarks import fixtures
+
+
+def without_slots(cls):
+    namespace = {
+        k: v for k, v in cls.__dict__.items() if k not in cls.__slots__ and k not in ("__slots__", "__weakref__")
+    }
+    return type(cls.__name__, (), namespace)
+
+
+def measure(cls, payloads):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    objects = [cls(data) for data in payloads]
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+    del objects
+    return {"bytes": current, "peak": peak, "blocks": blocks, "seconds": elapsed}
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    payloads = fixtures.submissions(count)
+    results = {
+        "dict": measure(without_slots(Submission), payloads),
+        "slots": measure(Submission, payloads),
+    }
+    print(f"Parsing {count} submissions")
+    for name, result in results.items():
+        print(
+            f"{name:>6}: {result['bytes'] / 2**20:7.2f} MiB retained, {result['peak'] / 2**20:7.2f} MiB peak, "
+            f"{result['blocks']:8d} blocks, {result['seconds']:.3f}s"
+        )
+    saved = 1 - results["slots"]["bytes"] / results["dict"]["bytes"]
+    print(f"__slots__ retains {saved:.0%} less memory")
+
+
+if __name__ == "__main__":
+    main()
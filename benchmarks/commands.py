@@ -0,0 +1,249 @@
+"""
+End to end latency and upstream calls of the heaviest commands, run against benchmarks.fake_dmoj
+on localhost with a fresh sqlite db. Each command's callback is called with a stand-in context that
+keeps its responses, once cold and once more warm, with the bot's real api rate limiter in place.
+Plot rendering needs matplotlib, if it isn't installed +plot points is reported as failed.
+
+Results are written as json, pass an earlier file to --compare to flag scenarios that make more
+upstream calls or got slower than the tolerance. Exits non zero on a regression.
+
+    python -m benchmarks.commands [--latency 0.05] [--rate-limit 0] [--save FILE] [--compare FILE]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parent.parent
+RESULTS = ROOT / "benchmarks" / "results"
+AUTHOR_ID = 1 << 40
+GUILD_ID = 1 << 41
+# Handles linked in the benchmark guild, +ranklist +server shows them
+LINKED = 50
+# Latency differences under this many ms are noise
+NOISE_MS = 50
+
+# name, module and command, options
+SCENARIOS = [
+    ("bootstrap", None, None, {}),
+    ("user", "extensions.user", "user", {"username": "fixture_user0", "amount": 3}),
+    ("gimme", "extensions.user", "gimme", {"username": "fixture_user1", "points": [1, 50], "filters": []}),
+    ("plot points", "extensions.plot", "points", {"usernames": ["fixture_user2"]}),
+    ("ranklist", "extensions.contest", "ranklist", {"key": "fixture_contest0", "args": ["+server"]}),
+    ("cache", "extensions.meta", "cache", {"username": "fixture_user3"}),
+]
+
+
+class Response:
+    def __init__(self, ctx):
+        self.ctx = ctx
+
+    async def message(self):
+        return None
+
+    async def edit(self, *args, **kwargs):
+        self.ctx.responses.append(args or kwargs)
+
+
+class Components:
+    """Takes whatever the paginator builds, buttons are never sent anywhere"""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self
+
+
+class App:
+    rest = SimpleNamespace(build_message_action_row=Components)
+
+    def subscribe(self, *args):
+        pass
+
+    def unsubscribe(self, *args):
+        pass
+
+
+class Context:
+    """What the commands use of a lightbulb context, responses are kept instead of sent"""
+
+    def __init__(self, options):
+        self.options = SimpleNamespace(**options)
+        self.author = SimpleNamespace(id=AUTHOR_ID)
+        self.app = App()
+        self.responses = []
+
+    def get_guild(self):
+        return SimpleNamespace(id=GUILD_ID, name="benchmark")
+
+    async def respond(self, *args, **kwargs):
+        self.responses.append(args or kwargs)
+        return Response(self)
+
+
+async def run_scenario(server, module, command, options):
+    from utils.bootstrap import Bootstrap
+
+    random.seed(0)
+    ctx = Context(options)
+    server.reset()
+    error = None
+    start = time.perf_counter()
+    try:
+        if module is None:
+            bootstrap = Bootstrap(seed=None)
+            await bootstrap.run()
+            if not bootstrap.ready:
+                error = "bootstrap failed"
+        else:
+            callback = getattr(__import__(module, fromlist=[command]), command).callback
+            await callback(ctx)
+    except Exception as e:
+        error = repr(e)
+    elapsed = time.perf_counter() - start
+    return {
+        "ms": round(elapsed * 1000, 1),
+        "calls": dict(server.calls),
+        "total_calls": sum(server.calls.values()),
+        "throttled": server.throttled,
+        "responses": len(ctx.responses),
+        "error": error,
+    }
+
+
+async def run(server, port):
+    from utils import api
+    from utils.db import Base, engine, session, Handle as Handle_DB
+
+    Base.metadata.create_all(engine)
+    for idx in range(LINKED):
+        session.add(Handle_DB(id=AUTHOR_ID + idx, handle=f"fixture_user{idx}", user_id=0, guild_id=GUILD_ID))
+    session.commit()
+
+    await server.start(port=port)
+    results = {}
+    try:
+        for name, module, command, options in SCENARIOS:
+            results[name] = {}
+            for phase in ["cold", "warm"]:
+                result = await run_scenario(server, module, command, options)
+                results[name][phase] = result
+                status = f"  {result['error']}" if result["error"] else ""
+                print(
+                    f"{name:>12} {phase}: {result['ms']:8.1f} ms {result['total_calls']:4} calls "
+                    f"{result['throttled']:3} throttled{status}"
+                )
+    finally:
+        if api._session is not None:
+            await api._session.close()
+        await server.close()
+    return results
+
+
+def compare(previous, current, tolerance):
+    """Prints the differences and returns whether anything regressed"""
+    regressed = False
+    for name, phases in current.items():
+        for phase, result in phases.items():
+            before = previous.get(name, {}).get(phase)
+            if before is None:
+                continue
+            notes = []
+            if result["total_calls"] > before["total_calls"]:
+                notes.append(f"calls {before['total_calls']} -> {result['total_calls']}")
+            slower = result["ms"] - before["ms"]
+            if slower > NOISE_MS and result["ms"] > before["ms"] * (1 + tolerance):
+                notes.append(f"{before['ms']:.0f} ms -> {result['ms']:.0f} ms")
+            if result["error"] and not before["error"]:
+                notes.append(f"now fails with {result['error']}")
+            if notes:
+                regressed = True
+                print(f"REGRESSION {name} {phase}: {', '.join(notes)}")
+    return regressed
+
+
+def commit():
+    proc = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+    return proc.stdout.strip() or "unknown"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark commands against a local DMOJ stand-in")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds the fake waits before answering")
+    parser.add_argument("--rate-limit", type=int, default=0, help="Requests per second before a 429, 0 for none")
+    parser.add_argument("--problems", type=int, default=5000)
+    parser.add_argument("--submissions", type=int, default=3000, help="Submissions of each user")
+    parser.add_argument("--participants", type=int, default=1000, help="Rankings of each contest")
+    parser.add_argument("--save", help="Where to write the results, defaults to benchmarks/results/<commit>.json")
+    parser.add_argument("--compare", help="Earlier results to check against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown, as a fraction")
+    args = parser.parse_args()
+
+    settings = {
+        "latency": args.latency,
+        "rate_limit": args.rate_limit,
+        "problems": args.problems,
+        "submissions": args.submissions,
+        "participants": args.participants,
+    }
+    tmp = tempfile.mkdtemp()
+    port = free_port()
+    site_url = f"http://127.0.0.1:{port}/"
+    # Read by utils.constants, so set before anything from utils is imported
+    os.environ["JOMD_SITE_URL"] = site_url
+    os.environ["JOMD_RATING_PREDICTIONS_URL"] = site_url + "rating/contest/{key}/api"
+    os.environ["JOMD_DB_URI"] = f"sqlite:///{os.path.join(tmp, 'benchmark.db')}"
+    os.environ["JOMD_SEED_SNAPSHOT"] = ""
+    os.environ.pop("JOMD_TOKEN", None)
+    from benchmarks.fake_dmoj import FakeDMOJ
+
+    server = FakeDMOJ(
+        problems=args.problems,
+        submissions=args.submissions,
+        participants=args.participants,
+        latency=args.latency,
+        rate_limit=args.rate_limit,
+    )
+    # The plot commands write to ./graphs
+    os.chdir(ROOT)
+    try:
+        scenarios = asyncio.run(run(server, port))
+    finally:
+        shutil.rmtree(tmp)
+
+    ref = commit()
+    save = Path(args.save) if args.save else RESULTS / f"{ref}.json"
+    save.parent.mkdir(parents=True, exist_ok=True)
+    with open(save, "w") as f:
+        json.dump(
+            {"commit": ref, "date": datetime.now().isoformat(), "settings": settings, "scenarios": scenarios},
+            f,
+            indent=2,
+        )
+    print(f"Results written to {save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        if previous["settings"] != settings:
+            print(f"Warning: compared against a run with different settings {previous['settings']}")
+        if compare(previous["scenarios"], scenarios, args.tolerance):
+            raise SystemExit(1)
+        print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Time and memory to list every contest with the rankings and format columns deferred
+(the default) versus undeferred, on a scratch sqlite db filled with fixture contests.
+
+    python -m benchmarks.contest_columns [contests] [participants]
+"""
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, undefer
+from utils.db import Base, Contest as Contest_DB
+from utils.api import Contest
+from benchmarks import fixtures
+
+
+def fill(session, count, participants):
+    for idx in range(count):
+        contest = Contest(fixtures.contest(f"fixture{idx}", participants=participants, seed=idx))
+        session.add(Contest_DB(contest))
+    session.commit()
+
+
+def measure(session, *options):
+    session.expunge_all()
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    contests = session.query(Contest_DB).options(*options).filter(Contest_DB.is_rated == 1).all()
+    keys = [(contest.key, contest.end_time, contest.is_private) for contest in contests]
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(keys) == len(contests)
+    return elapsed, peak
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    participants = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine("sqlite:///" + os.path.join(tmp, "bench.db"))
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        fill(session, count, participants)
+        print(f"Listing {count} contests with {participants} participants each")
+        for name, options in [
+            ("deferred", ()),
+            ("undeferred", (undefer(Contest_DB.rankings), undefer(Contest_DB._format))),
+        ]:
+            elapsed, peak = measure(session, *options)
+            print(f"{name:>10}: {elapsed * 1000:8.1f} ms, {peak / 2**20:7.2f} MiB peak")
+        session.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
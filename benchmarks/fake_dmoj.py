@@ -0,0 +1,260 @@
+"""
+Local stand-in for DMOJ serving the synthetic payloads from benchmarks.fixtures: the api/v2 endpoints,
+the user and submission pages that are scraped, and evanzhang.ca's rating predictions.
+
+Every request waits latency seconds and is counted per route. With rate_limit set, requests past that
+many in the last second are answered with a 429 like DMOJ does.
+
+    python -m benchmarks.fake_dmoj [port]
+"""
+import asyncio
+import collections
+import functools
+import random
+import sys
+import time
+from aiohttp import web
+from benchmarks import fixtures
+from utils import codec
+
+PER_PAGE = 1000
+# Not DMOJ, so not under its rate limit
+RATING_PREDICTIONS = "/rating/contest/{key}/api"
+
+
+def contest_key(idx):
+    return f"fixture_contest{idx}"
+
+
+def _json(data, status=200):
+    return web.Response(text=codec.dumps(data), status=status, content_type="application/json")
+
+
+def _not_found(kind):
+    return _json({"api_version": "2.0", "method": "get", "fetched": "", "error": {"code": 404, "message": kind}}, 404)
+
+
+class FakeDMOJ:
+    def __init__(
+        self,
+        problems: int = 5000,
+        users: int = 2000,
+        submissions: int = 3000,
+        contests: int = 20,
+        participants: int = 1000,
+        latency: float = 0.0,
+        rate_limit: int = 0,
+    ):
+        self.problem_count = problems
+        self.user_count = users
+        self.submission_count = submissions
+        self.contest_count = contests
+        self.participants = participants
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.calls = collections.Counter()
+        self.throttled = 0
+        self._recent = collections.deque()
+        self._problems = fixtures.problems(problems)
+        self._runner = None
+
+        self.app = web.Application(middlewares=[self._middleware])
+        self.app.router.add_get("/api/v2/problems", self.problems)
+        self.app.router.add_get("/api/v2/problem/{code}", self.problem)
+        self.app.router.add_get("/api/v2/users", self.users)
+        self.app.router.add_get("/api/v2/user/{username}", self.user)
+        self.app.router.add_get("/api/v2/submissions", self.submissions)
+        self.app.router.add_get("/api/v2/contests", self.contests)
+        self.app.router.add_get("/api/v2/contest/{key}", self.contest)
+        self.app.router.add_get("/api/v2/languages", self.languages)
+        self.app.router.add_get("/api/v2/organizations", self.organizations)
+        self.app.router.add_get("/user/{username}", self.user_page)
+        self.app.router.add_get("/submissions/user/{username}/", self.submissions_page)
+        self.app.router.add_get(RATING_PREDICTIONS, self.rating_predictions)
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        resource = request.match_info.route.resource
+        route = resource.canonical if resource is not None else "unknown"
+        self.calls[route] += 1
+        if self.rate_limit and route != RATING_PREDICTIONS:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] >= 1:
+                self._recent.popleft()
+            if len(self._recent) >= self.rate_limit:
+                self.throttled += 1
+                return _json({"error": {"code": 429, "message": "rate limited"}}, 429)
+            self._recent.append(now)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return await handler(request)
+
+    def reset(self) -> None:
+        self.calls.clear()
+        self.throttled = 0
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Returns the site url to use as SITE_URL"""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        return f"http://{host}:{port}/"
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    # Payloads are generated on first use and kept
+
+    def _page(self, request, objects):
+        page_index = int(request.query.get("page", 1))
+        start = (page_index - 1) * PER_PAGE
+        return _json(fixtures.page(objects[start:start + PER_PAGE], page_index, PER_PAGE, len(objects)))
+
+    def _user_index(self, username):
+        if not username.startswith("fixture_user"):
+            return None
+        idx = username[len("fixture_user"):]
+        return int(idx) if idx.isdigit() and int(idx) < self.user_count else None
+
+    @functools.lru_cache(maxsize=None)
+    def _user(self, idx):
+        rng = random.Random(idx)
+        solved = [fixtures.problem_code(code) for code in rng.sample(range(self.problem_count), 300)]
+        contests = [contest_key(key) for key in rng.sample(range(self.contest_count), min(5, self.contest_count))]
+        return codec.dumps(fixtures.envelope({"object": fixtures.user(f"fixture_user{idx}", solved, contests, idx)}))
+
+    @functools.lru_cache(maxsize=None)
+    def _submissions(self, idx):
+        submissions = fixtures.submissions(self.submission_count, f"fixture_user{idx}", self.problem_count, idx)
+        # Ids are unique across users on DMOJ
+        for submission in submissions:
+            submission["id"] += idx * self.submission_count
+        return submissions
+
+    @functools.lru_cache(maxsize=None)
+    def _contest(self, idx):
+        return fixtures.contest(contest_key(idx), self.participants, seed=idx)
+
+    def _contest_index(self, key):
+        idx = key[len("fixture_contest"):] if key.startswith("fixture_contest") else ""
+        return int(idx) if idx.isdigit() and int(idx) < self.contest_count else None
+
+    # api/v2
+
+    async def problems(self, request):
+        return self._page(request, self._problems)
+
+    async def problem(self, request):
+        code = request.match_info["code"]
+        idx = code[len("fixture"):] if code.startswith("fixture") else ""
+        if not idx.isdigit() or int(idx) >= self.problem_count:
+            return _not_found("problem")
+        return _json(fixtures.envelope({"object": fixtures.problem(int(idx))}))
+
+    async def users(self, request):
+        return self._page(request, fixtures.users(self.user_count))
+
+    async def user(self, request):
+        idx = self._user_index(request.match_info["username"])
+        if idx is None:
+            return _not_found("user")
+        return web.Response(text=self._user(idx), content_type="application/json")
+
+    async def submissions(self, request):
+        idx = self._user_index(request.query.get("user", ""))
+        submissions = self._submissions(idx) if idx is not None else []
+        if "problem" in request.query:
+            submissions = [sub for sub in submissions if sub["problem"] == request.query["problem"]]
+        if "result" in request.query:
+            submissions = [sub for sub in submissions if sub["result"] == request.query["result"]]
+        return self._page(request, submissions)
+
+    async def contests(self, request):
+        contests = []
+        for idx in range(self.contest_count):
+            contest = dict(self._contest(idx))
+            del contest["problems"], contest["rankings"]
+            contests.append(contest)
+        return self._page(request, contests)
+
+    async def contest(self, request):
+        idx = self._contest_index(request.match_info["key"])
+        if idx is None:
+            return _not_found("contest")
+        return _json(fixtures.envelope({"object": self._contest(idx)}))
+
+    async def languages(self, request):
+        return self._page(request, fixtures.languages())
+
+    async def organizations(self, request):
+        return self._page(request, [])
+
+    # Scraped pages, only the markup the bot looks at
+
+    async def user_page(self, request):
+        username = request.match_info["username"]
+        idx = self._user_index(username)
+        if idx is None:
+            return web.Response(status=404)
+        return web.Response(
+            text=(
+                f'<img class="user-gravatar" src="https://example.com/{username}.png">'
+                '<div class="content-description"><p>Fixture user</p></div>'
+                '<div class="user-sidebar"><div>Points</div><div>Problems</div><div>Rank</div>'
+                f"<div>Rank by points: #{idx + 1}</div></div>"
+            ),
+            content_type="text/html",
+        )
+
+    async def submissions_page(self, request):
+        idx = self._user_index(request.match_info["username"])
+        if idx is None:
+            return web.Response(status=404)
+        rows = []
+        for sub in reversed(self._submissions(idx)[-20:]):
+            score = int(sub["points"])
+            rows.append(
+                f'<div class="submission-row" id="{sub["id"]}">'
+                f'<div class="sub-result {sub["result"]}"><div class="score">{score} / 10</div></div>'
+                f'<span class="language">{sub["language"]}</span>'
+                f'<div class="name"><a href="/problem/{sub["problem"]}">{sub["problem"]}</a></div>'
+                f'<span class="time-with-rel" data-iso="{sub["date"]}"></span>'
+                f'<div class="time" title="{sub["time"]}s"></div>'
+                f'<div class="memory">{sub["memory"] / 1024:.1f} MB</div>'
+                "</div>"
+            )
+        return web.Response(text="".join(rows), content_type="text/html")
+
+    async def rating_predictions(self, request):
+        idx = self._contest_index(request.match_info["key"])
+        if idx is None:
+            return web.Response(status=404)
+        users = {}
+        for rank, ranking in enumerate(self._contest(idx)["rankings"]):
+            if ranking["old_rating"] is not None:
+                users[ranking["user"]] = {
+                    "rank": rank + 1,
+                    "old_rating": ranking["old_rating"],
+                    "new_rating": ranking["new_rating"],
+                    "rating_change": ranking["new_rating"] - ranking["old_rating"],
+                }
+        return _json({"users": users})
+
+
+async def serve(port):
+    server = FakeDMOJ()
+    print(f"Serving fake DMOJ at {await server.start(port=port)}, Ctrl+C to stop")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(serve(int(sys.argv[1]) if len(sys.argv) > 1 else 8000))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,212 @@
+"""
+Synthetic payloads shaped like DMOJ's api/v2 responses, generated from a fixed seed so
+benchmark runs are comparable with each other
+"""
+import random
+from datetime import datetime, timedelta, timezone
+
+RESULTS = ["AC", "AC", "AC", "WA", "WA", "TLE", "MLE", "RTE", "IR", "CE"]
+LANGUAGES = ["PY3", "CPP17", "CPP20", "JAVA11", "C", "PYPY3", "TEXT"]
+TYPES = [
+    "Ad Hoc",
+    "Data Structures",
+    "Dynamic Programming",
+    "Graph Theory",
+    "Greedy Algorithms",
+    "Simple Math",
+    "String Algorithms",
+    "Brute Force",
+]
+GROUPS = ["CCC", "COCI", "DMOPC", "DMPG", "Mock CCC", "IOI", "Max's Anger Contest", "Bronze"]
+START = datetime(2015, 1, 1, tzinfo=timezone.utc)
+
+
+def envelope(data):
+    return {"api_version": "2.0", "method": "get", "fetched": START.isoformat(), "data": data}
+
+
+def page(objects, page_index, objects_per_page, total_objects):
+    total_pages = max(1, -(-total_objects // objects_per_page))
+    return envelope(
+        {
+            "current_object_count": len(objects),
+            "objects_per_page": objects_per_page,
+            "page_index": page_index,
+            "has_more": page_index < total_pages,
+            "total_pages": total_pages,
+            "total_objects": total_objects,
+            "objects": objects,
+        }
+    )
+
+
+def problem_code(idx):
+    return f"fixture{idx}"
+
+
+def problem_name(rng):
+    # Made up words so names share trigrams about as often as real ones do
+    words = ["".join(rng.choice("abcdefghijklmnoprstuvwy") for _ in range(rng.randint(3, 9))) for _ in range(3)]
+    return f"{rng.choice(GROUPS)} '{rng.randint(10, 23)} {' '.join(words[: rng.randint(1, 3)]).title()}"
+
+
+def problems(count, seed=0):
+    rng = random.Random(seed)
+    ret = []
+    for idx in range(count):
+        ret.append(
+            {
+                "code": problem_code(idx),
+                "name": problem_name(rng),
+                "types": rng.sample(TYPES, rng.randint(1, 3)),
+                "group": rng.choice(GROUPS),
+                "points": rng.choice([3, 5, 7, 10, 12, 15, 20, 25, 30]),
+                "partial": rng.random() < 0.5,
+                "is_organization_private": False,
+                "is_public": True,
+            }
+        )
+    return ret
+
+
+def problem(idx, seed=0):
+    ret = problems(idx + 1, seed)[idx]
+    ret.update(
+        {
+            "authors": ["fixture_author"],
+            "time_limit": 2.0,
+            "memory_limit": 262144,
+            "language_resource_limits": [],
+            "short_circuit": False,
+            "languages": LANGUAGES,
+            "organizations": [],
+        }
+    )
+    return ret
+
+
+def languages():
+    return [
+        {
+            "id": idx + 1,
+            "key": key,
+            "short_name": key,
+            "common_name": key.rstrip("0123456789"),
+            "ace_mode_name": key.lower(),
+            "pygments_name": key.lower(),
+            "code_template": "",
+        }
+        for idx, key in enumerate(LANGUAGES)
+    ]
+
+
+def submissions(count, user="fixture_user", problem_count=2000, seed=0):
+    rng = random.Random(seed)
+    ret = []
+    for idx in range(count):
+        result = rng.choice(RESULTS)
+        ret.append(
+            {
+                "id": idx + 1,
+                "problem": problem_code(rng.randrange(problem_count)),
+                "user": user,
+                "date": (START + timedelta(minutes=idx * 7)).isoformat(),
+                "language": rng.choice(LANGUAGES),
+                "time": round(rng.random() * 2, 3),
+                "memory": float(rng.randint(1000, 260000)),
+                "points": float(rng.choice([0, 3, 5, 7, 10])) if result == "AC" else 0.0,
+                "result": result,
+            }
+        )
+    return ret
+
+
+def user(username="fixture_user", solved=(), contests=(), seed=0):
+    rng = random.Random(seed)
+    return {
+        "id": rng.randint(1, 10**6),
+        "username": username,
+        "points": round(rng.random() * 1000, 2),
+        "performance_points": round(rng.random() * 500, 2),
+        "problem_count": len(solved),
+        "rank": "user",
+        "rating": rng.randint(800, 2800),
+        "solved_problems": list(solved),
+        "organizations": [],
+        "contests": [{"key": key, "score": 100.0, "cumulative_time": 1000, "rating": None} for key in contests],
+    }
+
+
+def users(count, seed=0):
+    rng = random.Random(seed)
+    return [
+        {
+            "id": idx + 1,
+            "username": f"fixture_user{idx}",
+            "points": round(rng.random() * 1000, 2),
+            "performance_points": round(rng.random() * 500, 2),
+            "problem_count": rng.randint(0, 1500),
+            "rank": "user",
+            "rating": rng.choice([None, rng.randint(800, 2800)]),
+        }
+        for idx in range(count)
+    ]
+
+
+def contest(key="fixture_contest", participants=1000, problem_count=6, seed=0):
+    rng = random.Random(seed)
+    start = START + timedelta(days=rng.randint(0, 3000))
+    rankings = []
+    for idx in range(participants):
+        solutions = []
+        for _ in range(problem_count):
+            if rng.random() < 0.3:
+                solutions.append(None)
+            else:
+                solutions.append({"time": rng.random() * 10800, "points": float(rng.randint(0, 15)), "penalty": 0})
+        old_rating = rng.choice([None, rng.randint(800, 2800)])
+        rankings.append(
+            {
+                "user": f"fixture_user{idx}",
+                "start_time": start.isoformat(),
+                "end_time": (start + timedelta(hours=3)).isoformat(),
+                "score": sum(solution["points"] for solution in solutions if solution),
+                "cumulative_time": rng.randint(0, 10800),
+                "tiebreaker": 0.0,
+                "old_rating": old_rating,
+                "new_rating": old_rating and old_rating + rng.randint(-100, 100),
+                "is_disqualified": False,
+                "solutions": solutions,
+            }
+        )
+    return {
+        "key": key,
+        "name": f"Fixture Contest {key}",
+        "start_time": start.isoformat(),
+        "end_time": (start + timedelta(hours=3)).isoformat(),
+        "time_limit": None,
+        "is_rated": True,
+        "rate_all": False,
+        "has_rating": True,
+        "rating_floor": None,
+        "rating_ceiling": None,
+        "hidden_scoreboard": False,
+        "is_organization_private": False,
+        "organizations": [],
+        "is_private": False,
+        "tags": ["fixture"],
+        "format": {"name": "default", "config": {}},
+        "problems": [
+            {
+                "points": 100,
+                "partial": True,
+                "is_pretested": False,
+                "max_submissions": 0,
+                "label": str(idx + 1),
+                "name": f"Fixture Problem {idx}",
+                "code": problem_code(idx),
+            }
+            for idx in range(problem_count)
+        ],
+        "rankings": rankings,
+    }
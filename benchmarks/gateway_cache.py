@@ -0,0 +1,209 @@
+"""
+Memory held by hikari's cache for each gateway profile in utils.gateway, per 1000 guild members.
+
+Feeds the events Discord would send under each profile's intents (guild creates with members and,
+with presence intents, presences, then presence updates and messages) straight into hikari's event
+manager, in a fresh process per profile so the resident set sizes are comparable.
+
+    python -m benchmarks.gateway_cache [guilds] [members per guild]
+"""
+import asyncio
+import multiprocessing
+import os
+import sys
+import tracemalloc
+import hikari
+from utils.gateway import gateway_profile
+
+BOT_ID = 1 << 40
+MESSAGES = 5000
+
+
+class Shard:
+    """Just enough of a gateway shard for the event manager, nothing is sent anywhere"""
+
+    id = 0
+
+    def get_user_id(self):
+        return hikari.Snowflake(BOT_ID)
+
+    async def request_guild_members(self, *args, **kwargs):
+        pass
+
+
+def snowflake(guild, idx):
+    return str((guild << 24) + idx + 1)
+
+
+def user(guild, idx):
+    return {"id": snowflake(guild, idx), "username": f"user{idx}", "discriminator": "0001", "avatar": None}
+
+
+def guild_create(guild, members, presences):
+    roles = [
+        {
+            "id": snowflake(guild, idx),
+            "name": "@everyone" if idx == 0 else f"role{idx}",
+            "color": 0,
+            "hoist": False,
+            "position": idx,
+            "permissions": "0",
+            "managed": False,
+            "mentionable": False,
+        }
+        for idx in range(10)
+    ]
+    return {
+        "id": snowflake(guild, 0),
+        "name": f"guild{guild}",
+        "icon": None,
+        "splash": None,
+        "discovery_splash": None,
+        "owner_id": snowflake(guild, 1),
+        "afk_channel_id": None,
+        "afk_timeout": 300,
+        "verification_level": 0,
+        "default_message_notifications": 0,
+        "explicit_content_filter": 0,
+        "roles": roles,
+        "emojis": [],
+        "features": [],
+        "mfa_level": 0,
+        "application_id": None,
+        "system_channel_id": None,
+        "system_channel_flags": 0,
+        "rules_channel_id": None,
+        "joined_at": "2021-01-01T00:00:00+00:00",
+        "large": False,
+        "member_count": members,
+        "voice_states": [],
+        "members": [
+            {
+                "user": user(guild, idx),
+                "nick": None,
+                "roles": [snowflake(guild, idx % 9 + 1)],
+                "joined_at": "2021-01-01T00:00:00+00:00",
+                "deaf": False,
+                "mute": False,
+            }
+            for idx in range(members)
+        ],
+        "channels": [
+            {
+                "id": snowflake(guild, 1 << 20),
+                "type": 0,
+                "name": "general",
+                "topic": None,
+                "nsfw": False,
+                "last_message_id": None,
+                "rate_limit_per_user": 0,
+                "parent_id": None,
+                "position": 0,
+                "permission_overwrites": [],
+            }
+        ],
+        "threads": [],
+        "presences": [presence(guild, idx) for idx in range(members)] if presences else [],
+        "max_members": 250000,
+        "vanity_url_code": None,
+        "description": None,
+        "banner": None,
+        "premium_tier": 0,
+        "preferred_locale": "en-US",
+        "public_updates_channel_id": None,
+        "nsfw_level": 0,
+        "stickers": [],
+    }
+
+
+def presence(guild, idx):
+    return {
+        "user": {"id": snowflake(guild, idx)},
+        "guild_id": snowflake(guild, 0),
+        "status": "online",
+        "activities": [{"name": "DMOJ", "type": 0, "created_at": 1609459200000}],
+        "client_status": {"desktop": "online"},
+    }
+
+
+def message(guild, idx, members):
+    return {
+        "id": snowflake(guild, (1 << 21) + idx),
+        "channel_id": snowflake(guild, 1 << 20),
+        "guild_id": snowflake(guild, 0),
+        "author": user(guild, idx % members),
+        "member": {"roles": [], "joined_at": "2021-01-01T00:00:00+00:00", "deaf": False, "mute": False},
+        "content": f"+user user{idx % members}",
+        "timestamp": "2021-01-01T00:00:00+00:00",
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+        "flags": 0,
+    }
+
+
+def rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+async def fill(bot, guilds, members):
+    presences = bool(bot.intents & hikari.Intents.GUILD_PRESENCES)
+    messages = bool(bot.intents & hikari.Intents.GUILD_MESSAGES)
+    shard = Shard()
+    events = bot.event_manager
+    for guild in range(1, guilds + 1):
+        await events.on_guild_create(shard, guild_create(guild, members, presences))
+        if presences:
+            for idx in range(members):
+                await events.on_presence_update(shard, presence(guild, idx))
+        if messages:
+            for idx in range(MESSAGES // guilds):
+                await events.on_message_create(shard, message(guild, idx, members))
+
+
+def measure(profile, guilds, members, results):
+    intents, cache_settings = gateway_profile(profile)
+    bot = hikari.GatewayBot("benchmark", intents=intents, cache_settings=cache_settings, banner=None)
+    before = rss()
+    tracemalloc.start()
+    asyncio.run(fill(bot, guilds, members))
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    cache = bot.cache
+    counts = {
+        "members": sum(len(cache.get_members_view_for_guild(guild_id)) for guild_id in cache.get_guilds_view()),
+        "presences": sum(len(presences) for presences in cache.get_presences_view().values()),
+        "messages": len(cache.get_messages_view()),
+    }
+    results.put((profile, rss() - before, current, counts))
+
+
+def main():
+    guilds = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    members = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    print(f"{guilds} guilds with {members} members each, {MESSAGES} messages")
+    for profile in ["all", "minimal"]:
+        worker = context.Process(target=measure, args=(profile, guilds, members, results))
+        worker.start()
+        worker.join()
+        if worker.exitcode != 0:
+            raise RuntimeError(f"{profile} benchmark failed")
+        profile, rss_delta, traced, counts = results.get()
+        per_thousand = 1000 / (guilds * members)
+        print(
+            f"{profile:>8}: {rss_delta * per_thousand / 2**20:6.2f} MiB rss and {traced * per_thousand / 2**20:6.2f} "
+            f"MiB allocated per 1000 members, cached {counts}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Decode and encode time of each installed JSON codec on fixture payloads for
+/api/v2/contest/<key> and a /api/v2/submissions page.
+
+    python -m benchmarks.json_codec [rounds]
+"""
+import json
+import sys
+import time
+from utils import codec
+from benchmarks import fixtures
+
+
+def best(func, arg, rounds):
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        func(arg)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    payloads = {
+        "contest (3000 users)": fixtures.envelope({"object": fixtures.contest(participants=3000)}),
+        "submissions page": fixtures.page(fixtures.submissions(1000), 1, 1000, 50000),
+    }
+    codecs = {}
+    for name, load in codec.CODECS.items():
+        try:
+            codecs[name] = load()
+        except ImportError:
+            print(f"{name} is not installed, skipping")
+    print(f"Default codec: {codec.NAME}")
+    for payload_name, payload in payloads.items():
+        raw = json.dumps(payload).encode()
+        print(f"{payload_name}: {len(raw) / 2**20:.2f} MiB")
+        for name, (loads, dumps) in codecs.items():
+            assert loads(raw) == payload
+            decode = best(loads, raw, rounds)
+            encode = best(dumps, payload, rounds)
+            print(f"{name:>10}: loads {decode * 1000:8.2f} ms, dumps {encode * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""
+Build time and per query latency of the local problem search index over fixture problems.
+
+    python -m benchmarks.problem_search [problems]
+"""
+import sys
+import time
+from utils.search import ProblemIndex
+from benchmarks import fixtures
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    problems = [(problem["code"], problem["name"]) for problem in fixtures.problems(count)]
+    index = ProblemIndex()
+    start = time.perf_counter()
+    index.build(problems)
+    print(f"Indexed {count} problems in {(time.perf_counter() - start) * 1000:.1f} ms")
+    name = problems[count // 2][1]
+    # Exact name, a word dropped, a typo, a code, a group and no match
+    queries = [name, name.rsplit(" ", 1)[0], name[:-2] + name[-1], problems[-1][0], "dmopc", "qqqqqq"]
+    for query in queries:
+        rounds = 100
+        start = time.perf_counter()
+        for _ in range(rounds):
+            codes = index.search(query, limit=10)
+        elapsed = (time.perf_counter() - start) / rounds
+        print(f"{query!r:>40}: {elapsed * 1e6:8.0f} us, top {codes[:3]}")
+
+
+if __name__ == "__main__":
+    main()
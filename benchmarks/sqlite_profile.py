@@ -0,0 +1,102 @@
+"""
+Write throughput and read concurrency of each sqlite profile in utils.db.SQLITE_PROFILES.
+
+Writes are one submission per commit, like the bot storing pages and gitgud results. Reads
+are counted from a few threads running a +gimme style query while one thread keeps writing.
+
+    python -m benchmarks.sqlite_profile [commits] [seconds]
+"""
+import os
+import sys
+import tempfile
+import threading
+import time
+from sqlalchemy import create_engine, func
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import SingletonThreadPool
+from utils.db import Base, Submission as Submission_DB, SQLITE_PROFILES, apply_sqlite_profile
+from utils.api import Submission
+from benchmarks import fixtures
+
+READERS = 3
+
+
+def writes(Session, payloads):
+    session = Session()
+    start = time.perf_counter()
+    for data in payloads:
+        session.add(Submission_DB(Submission(data)))
+        session.commit()
+    session.close()
+    return len(payloads) / (time.perf_counter() - start)
+
+
+def concurrent_reads(Session, payloads, seconds):
+    stop = threading.Event()
+    counts = [0] * READERS
+    errors = [0] * READERS
+    written = [0]
+
+    def read(idx):
+        session = Session()
+        while not stop.is_set():
+            try:
+                session.query(Submission_DB._code, func.max(Submission_DB.points)).group_by(Submission_DB._code).all()
+                counts[idx] += 1
+            except OperationalError:
+                errors[idx] += 1
+            session.rollback()
+        session.close()
+
+    def write():
+        session = Session()
+        for data in payloads:
+            if stop.is_set():
+                break
+            try:
+                session.merge(Submission_DB(Submission(data)))
+                session.commit()
+                written[0] += 1
+            except OperationalError:
+                session.rollback()
+        session.close()
+
+    threads = [threading.Thread(target=read, args=(idx,)) for idx in range(READERS)]
+    threads.append(threading.Thread(target=write))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / seconds, written[0] / seconds, sum(errors)
+
+
+def main():
+    commits = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 3
+    payloads = fixtures.submissions(commits * 20)
+    print(f"{commits} single row commits, then {READERS} readers and a writer for {seconds}s")
+    for profile in SQLITE_PROFILES:
+        with tempfile.TemporaryDirectory() as tmp:
+            # Same pooling as utils.db, check_same_thread only so dispose can close the readers' connections
+            engine = create_engine(
+                "sqlite:///" + os.path.join(tmp, "bench.db"),
+                connect_args={"timeout": 0.5, "check_same_thread": False},
+                poolclass=SingletonThreadPool,
+            )
+            apply_sqlite_profile(engine, profile)
+            Base.metadata.create_all(engine)
+            Session = sessionmaker(bind=engine, autoflush=False)
+            rate = writes(Session, payloads[:commits])
+            reads, concurrent_writes, errors = concurrent_reads(Session, payloads[commits:], seconds)
+            engine.dispose()
+        print(
+            f"{profile:>8}: {rate:8.0f} commits/s alone, {reads:8.1f} reads/s and {concurrent_writes:6.1f} commits/s "
+            f"together, {errors} locked errors"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Cold start of the bot up to the point it connects to Discord, importing Main and loading every
+extension, measured with python -X importtime in a fresh interpreter.
+
+Exits non zero if startup takes longer than the budget or a plotting/scraping package got imported.
+
+    python -m benchmarks.startup [budget in seconds]
+"""
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SCRIPT = "import Main; Main.create_bot('benchmark')"
+HEAVY = {"matplotlib", "pandas", "seaborn", "numpy", "bs4", "html5lib"}
+
+
+def main():
+    budget = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SCRIPT], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    elapsed = time.perf_counter() - start
+
+    # Self time of every module, grouped by top level package
+    packages = defaultdict(int)
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        packages[name.strip().split(".")[0]] += int(self_us)
+
+    print(f"Startup took {elapsed * 1000:.0f} ms, {sum(packages.values()) / 1000:.0f} ms of it importing")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:10]:
+        print(f"{package:>20}: {self_us / 1000:6.1f} ms")
+
+    failed = False
+    heavy = sorted(HEAVY & packages.keys())
+    if heavy:
+        print(f"Imported at startup: {', '.join(heavy)}")
+        failed = True
+    if elapsed > budget:
+        print(f"Over the {budget:.2f} s budget")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
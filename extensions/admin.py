@@ -4,7 +4,15 @@ import hikari
 from pathlib import Path
 from utils.db import session, Contest as Contest_DB, Problem as Problem_DB, Submission as Submission_DB
 from utils.query import Query
+from utils.search import problem_index
+from utils.bootstrap import bootstrap, WarmingUp
+from utils.constants import USER_REFRESH_INTERVAL, GITGUD_POLL_INTERVAL
+from utils.gitgud import Gitgud
+from utils.jomd_common import run_periodically
+from utils.gateway import owns_guilds
 from operator import itemgetter
+import asyncio
+import functools
 import time
 import logging
 import traceback
@@ -16,6 +24,36 @@ plugin = lightbulb.Plugin("Admin")
 plugin.add_checks(lightbulb.checks.owner_only)
 # NOTE: REMOVE SLASH COMMANDS UNTIL SLASH PERMS V2 COME OUT
 
+refresh_task = None
+gitgud_task = None
+
+
+@plugin.listener(hikari.StartedEvent)
+async def on_started(event: hikari.StartedEvent) -> None:
+    global refresh_task, gitgud_task
+    # With several shard processes the problems are shared through the db, only the one running shard 0 fetches
+    if 0 in event.app.shards:
+        bootstrap.start()
+    # Every process refreshes the users and checks the challenges of its own guilds so its caches are updated
+    # in place, a handle in the guilds of several processes is left to the one with the lowest shard and the
+    # others pick it up when their caches expire
+    owns = functools.partial(owns_guilds, event.app)
+    if USER_REFRESH_INTERVAL > 0 and refresh_task is None:
+        refresh_task = asyncio.create_task(run_periodically(USER_REFRESH_INTERVAL, Query().refresh_linked_users, owns))
+    if GITGUD_POLL_INTERVAL > 0 and gitgud_task is None:
+        gitgud_task = asyncio.create_task(run_periodically(GITGUD_POLL_INTERVAL, Gitgud().check_current, owns))
+
+
+@plugin.listener(hikari.StoppingEvent)
+async def on_stopping(event: hikari.StoppingEvent) -> None:
+    global refresh_task, gitgud_task
+    if refresh_task is not None:
+        refresh_task.cancel()
+        refresh_task = None
+    if gitgud_task is not None:
+        gitgud_task.cancel()
+        gitgud_task = None
+
 
 @plugin.listener(lightbulb.PrefixCommandCompletionEvent)
 async def on_prefix_command(event: lightbulb.PrefixCommandCompletionEvent) -> None:
@@ -39,6 +77,9 @@ async def on_error(event: lightbulb.CommandErrorEvent) -> None:
         if isinstance(event.exception, lightbulb.CommandNotFound):
             return await event.context.respond(f"Where command? ({event.exception})")
 
+        if isinstance(event.exception, WarmingUp):
+            return await event.context.respond(str(event.exception))
+
         if isinstance(event.exception, lightbulb.errors.MissingRequiredRole):
             return await event.context.respond(f"Missing required roles ({event.exception})")
 
@@ -92,12 +133,9 @@ async def force(ctx: lightbulb.Context) -> None:
             await ctx.respond(
                 f"There is no contests with the key {ctx.options.key} " f"cached. Will try fetching contest"
             )
-        else:
-            q.delete()
-            session.commit()
         query = Query()
         try:
-            await query.get_contest(ctx.options.key)
+            await query.get_contest(ctx.options.key, cached=False)
         except ObjectNotFound:
             return await ctx.respond("Contest not found")
         await ctx.respond(f"Recached contest {ctx.options.key}")
@@ -107,12 +145,9 @@ async def force(ctx: lightbulb.Context) -> None:
             await ctx.respond(
                 f"There is no problems with the key {ctx.options.key} " f"cached. Will try fetching problem"
             )
-        else:
-            q.delete()
-            session.commit()
         query = Query()
         try:
-            await query.get_problem(ctx.options.key)
+            await query.get_problem(ctx.options.key, cached=False)
         except ObjectNotFound:
             return await ctx.respond("Problem not found")
         await ctx.respond(f"Recached problem {ctx.options.key}")
@@ -133,6 +168,15 @@ async def cache_contests(ctx: lightbulb.Context) -> None:
     return await msg.edit(content=f"Cached {len(contests)} contests")
 
 
+@plugin.command()
+@lightbulb.command("refresh_users", "Refresh the cached stats of every linked user")
+@lightbulb.implements(lightbulb.PrefixCommand)
+async def refresh_users(ctx: lightbulb.Context) -> None:
+    msg = await ctx.respond("Refreshing...")
+    handles, found, changed = await Query().refresh_linked_users()
+    return await msg.edit(content=f"Refreshed {found}/{handles} linked users, {changed} changed")
+
+
 @plugin.command()
 @lightbulb.command("update_problems", "Clears problem table and recaches problems")
 @lightbulb.implements(lightbulb.PrefixCommand)
@@ -142,6 +186,8 @@ async def update_problems(ctx: lightbulb.Context) -> None:
     msg = await ctx.respond("Updating...")
     session.query(Problem_DB).delete()
     session.commit()
+    # Bulk deletes skip the mapper events that keep the index in sync
+    problem_index.clear()
     query = Query()
     await query.get_problems()
     return await msg.edit(content="Updated all problems")
@@ -13,7 +13,8 @@ from utils.db import (
     Json,
 )
 from utils.query import Query
-from utils.api import ObjectNotFound
+from utils.api import ObjectNotFound, get_rating_predictions
+from utils.roles import role_index
 import hikari
 import lightbulb
 import typing as t
@@ -44,14 +45,9 @@ async def ranklist(ctx):
     key = ctx.options.key
     args = ctx.options.args
 
-    q = session.query(Contest_DB).filter(Contest_DB.key == key)
-    # Clear cache
-    if q.count():
-        q.delete()
-        session.commit()
     query = Query()
     try:
-        contest = await query.get_contest(key)
+        contest = await query.get_contest(key, cached=False)
     except ObjectNotFound:
         await ctx.respond("Contest not found")
         return
@@ -76,17 +72,11 @@ async def ranklist(ctx):
         elif arg == "+all":
             showAll = True
         else:
-            usernames.append((await query.get_user(arg)).username)
+            usernames.append((await query.get_user(arg, stale=True)).username)
 
     # The only way to calculate rating changes is by getting the volitility of all the users
-    # that means 100+ separate api calls
-    # How does evan do it?
-    # TODO: Use the custom api on evan's site
-    import requests
-
-    r = requests.get(f"https://evanzhang.ca/rating/contest/{key}/api")
-    if r:
-        rankings = r.json()["users"]
+    # that means 100+ separate api calls, evanzhang.ca does that for us
+    rankings = await get_rating_predictions(key)
 
     # Don't really need this, just sanity check
     # users = await asyncio.gather(*[query.get_user(username)
@@ -257,13 +247,8 @@ async def postcontest(ctx):
         if username is None:
             return await ctx.respond("Your account is not linked!")
 
-    q = session.query(Contest_DB).filter(Contest_DB.key == key)
-    # Clear cache
-    if q.count():
-        q.delete()
-        session.commit()
     try:
-        contest = await query.get_contest(key)
+        contest = await query.get_contest(key, cached=False)
     except ObjectNotFound:
         await ctx.respond("Contest not found")
         return
@@ -271,13 +256,8 @@ async def postcontest(ctx):
     if contest.is_organization_private:
         return await ctx.respond("Contest not found")
 
-    rc = lightbulb.RoleConverter(ctx)
-    for role_id in ctx.get_guild().get_roles():
-        _role = await rc.convert(str(role_id))
-        if _role.name == "postcontest " + key:
-            role = _role
-            break
-    else:
+    role = role_index.get_role(ctx.get_guild(), "postcontest " + key)
+    if role is None:
         return await ctx.respond(f"No `postcontest {key}` role found.")
 
     if update_all:
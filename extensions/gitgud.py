@@ -1,6 +1,8 @@
 import typing as t
 from utils.gitgud import Gitgud as Gitgud_utils
+from utils.leaderboard import gitgud_rankings
 from utils.query import Query
+from utils.bootstrap import problems_ready
 from utils.constants import SHORTHANDS, RATING_TO_POINT, POINT_VALUES
 from utils.jomd_common import gimme_common, PointRangeConverter
 from utils.db import (
@@ -25,6 +27,7 @@ import hikari
 from lightbulb.utils import nav
 from datetime import datetime
 from sqlalchemy import func
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
@@ -57,6 +60,7 @@ plugin = lightbulb.Plugin("GitGud")
     - regex
     - string"""
 )
+@lightbulb.add_checks(problems_ready)
 @lightbulb.command("gitgud", "Recommend a problem and gain point upon completion")
 @lightbulb.implements(lightbulb.PrefixCommand, lightbulb.SlashCommand)
 async def gitgud(ctx: lightbulb.Context) -> None:
@@ -151,7 +155,7 @@ async def gitlog(ctx):
     username = ctx.options.username
     username = username or query.get_handle(ctx.author.id, ctx.get_guild().id)
     try:
-        user = await query.get_user(username)
+        user = await query.get_user(username, stale=True)
         username = user.username
     except TypeError:
         username = None
@@ -159,17 +163,21 @@ async def gitlog(ctx):
         return await ctx.respond("You have not entered a valid DMOJ handle " "or linked with a DMOJ Account")
 
     gitgud_util = Gitgud_utils()
-    history = gitgud_util.get_all(username, ctx.get_guild().id)
+    history = gitgud_util.get_all(username, ctx.get_guild().id, limit=100)
 
     if len(history) == 0:
         embed = hikari.Embed(description="User have not completed any " "challenge")
         return await ctx.respond(embed=embed)
-    # paginate
 
+    # Only problems missing from the db need the api, the names of the rest came with the history
+    missing = list({solved.problem_id for solved, problem in history if problem is None})
+    fetched = await asyncio.gather(*map(query.get_problem, missing), return_exceptions=True)
+    names = {code: problem.name for code, problem in zip(missing, fetched) if not isinstance(problem, Exception)}
+
+    # paginate
     pag = lightbulb.utils.EmbedPaginator()
-    for idx, solved in enumerate(history):
-        # problem = solved.problem_id or await query.get_problem(solved.problem_id)
-        problem = await query.get_problem(solved.problem_id)
+    for solved, problem in history:
+        name = problem.name if problem is not None else names.get(solved.problem_id, solved.problem_id)
         days = (datetime.now() - solved.time).days
         if days == 0:
             days_str = "today"
@@ -177,9 +185,7 @@ async def gitlog(ctx):
             days_str = "yesterday"
         else:
             days_str = f"{days} days ago"
-        pag.add_line(f"[{problem.name}](https://dmoj.ca/problem/{problem.code}) " f"[+{solved.point}] ({days_str})")
-        if idx == 100:
-            break
+        pag.add_line(f"[{name}](https://dmoj.ca/problem/{solved.problem_id}) " f"[+{solved.point}] ({days_str})")
 
     @pag.embed_factory()
     def build_embed(page_index, content):
@@ -204,34 +210,14 @@ async def gotgud(ctx):
     if username is None:
         return await ctx.respond("You are not linked with a DMOJ Account")
 
-    user = await query.get_user(username)
+    user = await query.get_user(username, force=True)
     current = gitgud_util.get_current(username, ctx.get_guild().id)
-    closest = -1000
-    for key in RATING_TO_POINT:
-        if abs(key - user.rating) <= abs(closest - user.rating):
-            closest = key
-
-    # convert rating to point and get difference
-    rating_point = RATING_TO_POINT[closest]
     if current is None or current.problem_id is None:
         return await ctx.respond("No pending challenges")
 
     # check if user is scamming the bot :monkey:
     if gitgud_util.has_solved(username, current.problem_id):
-        # get closest rating
-        closest = -1000
-        for key in RATING_TO_POINT:
-            if abs(key - user.rating) <= abs(closest - user.rating):
-                closest = key
-        # convert rating to point and get difference
-        rating_point = RATING_TO_POINT[closest]
-        point_diff = POINT_VALUES.index(current.point) - POINT_VALUES.index(rating_point)
-
-        point = 10 + 2 * (point_diff)
-        point = max(point, 0)
-
-        gitgud_util.insert(username, ctx.get_guild().id, point, current.problem_id, datetime.now())
-        gitgud_util.clear(username, ctx.get_guild().id)
+        point = gitgud_util.complete(current, user.rating, datetime.now())
 
         completion_time = datetime.now() - current.time
         # convert from timedelta to readable string
@@ -267,7 +253,7 @@ async def howgud(ctx):
     query = Query()
     if username is None:
         username = query.get_handle(ctx.author.id, ctx.get_guild().id)
-    user = await query.get_user(username)
+    user = await query.get_user(username, stale=True)
     username = user.username
     ret = Gitgud_utils().get_point(username, ctx.get_guild().id)
     if ret is None:
@@ -281,6 +267,40 @@ async def howgud(ctx):
     return await ctx.respond(embed=embed)
 
 
+@plugin.command()
+@lightbulb.option("username", "Dmoj username to show the rank of", str, required=False, default=None)
+@lightbulb.command("gitgudtop", "Shows the server's gitgud leaderboard", aliases=["gudtop"])
+@lightbulb.implements(lightbulb.PrefixCommand, lightbulb.SlashCommand)
+async def gitgudtop(ctx):
+    """Shows server members ranked by gitgud points"""
+    query = Query()
+    username = ctx.options.username or query.get_handle(ctx.author.id, ctx.get_guild().id)
+    if username is not None:
+        # Rankings are keyed by the handle as DMOJ spells it
+        user = await query.get_user(username, stale=True)
+        username = user.username
+    ranking = gitgud_rankings.get(ctx.get_guild().id)
+
+    pag = lightbulb.utils.EmbedPaginator()
+    for i, (key, handle) in enumerate(ranking):
+        pag.add_line(f"{i+1} {handle} {-key}")
+
+    if len(ranking) == 0:
+        pag.add_line("Nobody has completed a challenge yet")
+
+    rank = ranking.rank(username)
+
+    @pag.embed_factory()
+    def build_embed(page_index, content):
+        embed = hikari.Embed(color=0xFCDB05).add_field(name="Top gitgud points", value=content)
+        if rank is not None:
+            embed.set_footer(f"Rank of {username}: {rank}/{len(ranking)}")
+        return embed
+
+    navigator = nav.ButtonNavigator(pag.build_pages())
+    await navigator.run(ctx)
+
+
 def load(bot: lightbulb.BotApp) -> None:
     bot.add_plugin(plugin)
 
@@ -3,7 +3,10 @@ from utils.api import ObjectNotFound
 from operator import itemgetter
 from utils.query import Query
 from utils.db import session, User as User_DB, Handle as Handle_DB, Contest as Contest_DB, Submission as Submission_DB
+from sqlalchemy.orm import undefer
 from utils.constants import RATING_TO_RANKS, RANKS, ADMIN_ROLES
+from utils.roles import role_index
+from utils.leaderboard import leaderboards, UNRATED
 from lightbulb.utils import nav
 import typing as t
 import asyncio
@@ -55,6 +58,26 @@ def has_any_role_names(role_names: t.List[str]) -> bool:
 plugin = lightbulb.Plugin("Handles")
 
 
+@plugin.listener(hikari.RoleCreateEvent)
+async def on_role_create(event: hikari.RoleCreateEvent) -> None:
+    role_index.add(event.role)
+
+
+@plugin.listener(hikari.RoleUpdateEvent)
+async def on_role_update(event: hikari.RoleUpdateEvent) -> None:
+    role_index.add(event.role)
+
+
+@plugin.listener(hikari.RoleDeleteEvent)
+async def on_role_delete(event: hikari.RoleDeleteEvent) -> None:
+    role_index.remove(event.guild_id, event.role_id)
+
+
+@plugin.listener(hikari.GuildLeaveEvent)
+async def on_guild_leave(event: hikari.GuildLeaveEvent) -> None:
+    role_index.clear(event.guild_id)
+
+
 @plugin.command()
 @lightbulb.option(
     "handle",
@@ -75,7 +98,7 @@ async def whois(ctx):
     if handle:
         user = None
         try:
-            user = await query.get_user(handle)
+            user = await query.get_user(handle, stale=True)
         except ObjectNotFound:
             username = None
         if user:
@@ -135,6 +158,7 @@ async def unlink(ctx: lightbulb.Context) -> None:
     session.query(Submission_DB).filter(Submission_DB._user == handle.handle).delete()
     session.delete(handle)
     session.commit()
+    leaderboards.remove(ctx.get_guild().id, handle.handle)
     await ctx.respond(escape_markdown(f"Unlinked you with handle {handle.handle}"))
 
 
@@ -185,14 +209,10 @@ async def link(ctx: lightbulb.Context) -> None:
     handle.guild_id = ctx.get_guild().id
     session.add(handle)
     session.commit()
+    leaderboards.add(ctx.get_guild().id, user)
     await ctx.respond(escape_markdown("%s, you now have linked your account to %s" % (ctx.author, username)))
 
-    rank_to_role = {}
-    rc = lightbulb.RoleConverter(ctx)
-    for role_id in ctx.get_guild().get_roles():
-        role = await rc.convert(str(role_id))
-        if role.name in RANKS:
-            rank_to_role[role.name] = role
+    rank_to_role = role_index.get_rank_roles(ctx.get_guild())
 
     rank = rating_to_rank(user.rating)
     # TODO Add guild specific option to disable updating roles
@@ -240,6 +260,7 @@ async def _set(ctx):
         )
         session.delete(handle)
         session.commit()
+        leaderboards.remove(ctx.get_guild().id, handle.handle)
         await ctx.respond(escape_markdown(f"Unlinked {member.display_name} with handle {handle.handle}"))
 
     if username == "+remove":
@@ -256,20 +277,16 @@ async def _set(ctx):
     handle.guild_id = ctx.get_guild().id
     session.add(handle)
     session.commit()
+    leaderboards.add(ctx.get_guild().id, user)
     await ctx.respond(escape_markdown(f"Linked {member.display_name} with {username}"))
 
-    rank_to_role = {}
-    rc = lightbulb.RoleConverter(ctx)
-    for role_id in ctx.get_guild().get_roles():
-        role = await rc.convert(str(role_id))
-        if role.name in RANKS:
-            rank_to_role[role.name] = role
+    rank_to_role = role_index.get_rank_roles(ctx.get_guild())
 
     rank = rating_to_rank(user.rating)
     if rank in rank_to_role:
         await _update_rank(member, rank_to_role[rank], "Dmoj account linked")
     else:
-        await ctx.respond("You are missing the `" + rank.name + "` role")
+        await ctx.respond("You are missing the `" + rank + "` role")
 
 
 @plugin.command()
@@ -290,35 +307,25 @@ async def top(ctx):
     arg = ctx.options.arg.lower()
     if arg != "rating" and arg != "maxrating" and arg != "points" and arg != "solved":
         return await ctx.respond_help("top")
-    users = (
-        session.query(User_DB)
-        .join(Handle_DB, Handle_DB.handle == User_DB.username)
-        .filter(Handle_DB.guild_id == ctx.get_guild().id)
-    )
-    leaderboard = []
-    for user in users:
-        if arg == "rating":
-            leaderboard.append([-(user.rating or -9999), user.username])
-        elif arg == "maxrating":
-            leaderboard.append([-(user.max_rating or -9999), user.username])
-        elif arg == "points":
-            leaderboard.append([-user.performance_points, user.username])
-        elif arg == "solved":
-            leaderboard.append([-(user.problem_count or 0), user.username])
-    leaderboard.sort()
+    leaderboard = leaderboards.get(ctx.get_guild().id, arg)
     pag = lightbulb.utils.EmbedPaginator()
-    for i, user in enumerate(leaderboard):
-        if (arg == "rating" or arg == "maxrating") and user[0] == 9999:
-            pag.add_line(f"{i+1} {user[1]} unrated")
+    for i, (key, username) in enumerate(leaderboard):
+        if (arg == "rating" or arg == "maxrating") and key == -UNRATED:
+            pag.add_line(f"{i+1} {username} unrated")
         else:
-            pag.add_line(f"{i+1} {user[1]} {-round(user[0],3)}")
+            pag.add_line(f"{i+1} {username} {-round(key,3)}")
 
     if len(leaderboard) == 0:
         pag.add_line("No users")
 
+    rank = leaderboard.rank(Query().get_handle(ctx.author.id, ctx.get_guild().id))
+
     @pag.embed_factory()
     def build_embed(page_index, content):
-        return hikari.Embed().add_field(name="Top DMOJ " + arg, value=content)
+        embed = hikari.Embed().add_field(name="Top DMOJ " + arg, value=content)
+        if rank is not None:
+            embed.set_footer(f"Your rank: {rank}/{len(leaderboard)}")
+        return embed
 
     navigator = nav.ButtonNavigator(pag.build_pages())
     await navigator.run(ctx)
@@ -356,7 +363,13 @@ async def update_roles(ctx):
 
     msg = await ctx.respond("Fetching ratings...")
 
-    contests = session.query(Contest_DB).filter(Contest_DB.is_rated == 1).order_by(Contest_DB.end_time.desc()).all()
+    contests = (
+        session.query(Contest_DB)
+        .options(undefer(Contest_DB.rankings))
+        .filter(Contest_DB.is_rated.is_(True))
+        .order_by(Contest_DB.end_time.desc())
+        .all()
+    )
 
     users = session.query(Handle_DB).filter(Handle_DB.guild_id == ctx.get_guild().id).all()
     new_ratings = {}
@@ -377,13 +390,7 @@ async def update_roles(ctx):
                 break
     members = [ctx.get_guild().get_member(handle.id) for handle in new_ratings]
 
-    # NOTE: Same piece of code in two other places
-    rank_to_role = {}
-    rc = lightbulb.RoleConverter(ctx)
-    for role_id in ctx.get_guild().get_roles():
-        role = await rc.convert(str(role_id))
-        if role.name in RANKS:
-            rank_to_role[role.name] = role
+    rank_to_role = role_index.get_rank_roles(ctx.get_guild())
 
     await msg.edit(content="Updating roles...")
 
@@ -4,8 +4,15 @@ import typing as t
 from utils.api import ObjectNotFound
 import typing
 from utils.query import Query
-from utils.db import session, Contest as Contest_DB, Submission as Submission_DB, User as User_DB, Problem as Problem_DB
-from utils.graph import plot_type_radar, plot_type_bar, plot_rating, plot_points, plot_solved
+from utils.bootstrap import problems_ready
+from utils.db import (
+    session,
+    json_contains,
+    Contest as Contest_DB,
+    Submission as Submission_DB,
+    User as User_DB,
+    Problem as Problem_DB,
+)
 from utils.jomd_common import calculate_points
 from lightbulb.commands.base import OptionModifier
 from operator import attrgetter, itemgetter
@@ -86,6 +93,7 @@ async def plot(ctx):
     required=False,
     default=[],
 )
+@lightbulb.add_checks(problems_ready)
 @lightbulb.command("solved", "Plot problems solved over time")
 @lightbulb.implements(lightbulb.PrefixSubCommand)
 async def solved(ctx):
@@ -131,6 +139,10 @@ async def solved(ctx):
             data_to_plot[date] = cnt
         total_data[username] = data_to_plot
 
+    # Imported here rather than at the top, matplotlib, pandas and seaborn take longer to import than
+    # the rest of the bot put together
+    from utils.graph import plot_solved
+
     plot_solved(total_data)
 
     embed = hikari.Embed(
@@ -152,6 +164,7 @@ async def solved(ctx):
     required=False,
     default=[],
 )
+@lightbulb.add_checks(problems_ready)
 @lightbulb.command("points", "Plot point progression")
 @lightbulb.implements(lightbulb.PrefixSubCommand)
 async def points(ctx):
@@ -196,7 +209,7 @@ async def points(ctx):
         data_to_plot = {}
         # O(N^2logN) :blobcreep:
         for submission in submissions:
-            code = submission.problem[0].code
+            code = submission.problem.code
             points = submission.points
             result = submission.result
 
@@ -216,6 +229,8 @@ async def points(ctx):
                 data_to_plot[submission.date] = cur_points
         total_data[username] = data_to_plot
 
+    from utils.graph import plot_points
+
     plot_points(total_data)
 
     embed = hikari.Embed(
@@ -267,8 +282,13 @@ async def rating(ctx):
     if len(users) > 10:
         return await ctx.respond("Too many users given, max 10")
 
-    cond = [Contest_DB.rankings.contains(user.username) for user in users]
-    q = session.query(Contest_DB).filter(or_(*cond)).filter(Contest_DB.is_rated == 1)
+    cond = [json_contains(Contest_DB.rankings, user.username, key="user") for user in users]
+    q = (
+        session.query(Contest_DB)
+        .options(orm.undefer(Contest_DB.rankings))
+        .filter(or_(*cond))
+        .filter(Contest_DB.is_rated.is_(True))
+    )
     contests = q.all()
 
     def get_rating_change(rankings, users):
@@ -294,6 +314,8 @@ async def rating(ctx):
                 data[contest.end_time].append(change)
             else:
                 data[contest.end_time].append(None)
+    from utils.graph import plot_rating
+
     plot_rating(data)
 
     embed = hikari.Embed(
@@ -329,6 +351,7 @@ async def rating(ctx):
     required=False,
     default=True,
 )
+@lightbulb.add_checks(problems_ready)
 @lightbulb.command("type", "Graph problems solved by popular problem types")
 @lightbulb.implements(lightbulb.PrefixSubCommand)
 async def type(ctx):
@@ -418,6 +441,8 @@ async def type(ctx):
 
     logger.debug("plot type data: %s", data)
 
+    from utils.graph import plot_type_radar, plot_type_bar
+
     if graph_type == "radar":
         plot_type_radar(data, as_percent, max_percentage)
     elif graph_type == "bar":
@@ -8,7 +8,9 @@ import typing as t
 
 # from discord.ext.commands.errors import BadArgument
 from utils.query import Query
-from utils.db import session
+from utils.bootstrap import problems_ready
+from utils.solved import solved_cache
+from utils.db import session, json_contains
 from sqlalchemy import alias, func, not_, orm
 from utils.db import Problem as Problem_DB, Contest as Contest_DB, User as User_DB, Submission as Submission_DB
 from utils.jomd_common import is_int, calculate_points, PointRangeConverter, gimme_common
@@ -100,7 +102,7 @@ async def user(ctx):
 
     embed = hikari.Embed(title=f"{username}'s latest submissions", color=0xFCDB05)
     for submission in submissions:
-        problem = submission.problem[0]
+        problem = submission.problem
         if problem.points is not None:
             points = str(int(problem.points)) + "p"
             if problem.partial:
@@ -108,10 +110,10 @@ async def user(ctx):
         else:
             points = "???"
 
-        true_short_name = submission.language[0].short_name
+        true_short_name = submission.language.short_name
         if true_short_name == "":
             # wtf dmoj
-            true_short_name = submission.language[0].key
+            true_short_name = submission.language.key
 
         embed.add_field(
             name="%s / %s" % (str(submission.score_num), str(submission.score_denom)),
@@ -120,14 +122,14 @@ async def user(ctx):
         )
 
         embed.add_field(
-            name="%s (%s)" % (submission.problem[0].name, points),
+            name="%s (%s)" % (submission.problem.name, points),
             value="%s | [Problem](https://dmoj.ca/problem/%s)"
             % (
                 submission.date.astimezone(TZ)
                 .strftime("%b. %d, %Y, %I:%M %p")
                 .replace("AM", "a.m.")
                 .replace("PM", "p.m."),
-                submission.problem[0].code,
+                submission.problem.code,
             ),
             # Jan. 13, 2021, 12:17 a.m.
             # %b. %d, %Y, %I:%M %p
@@ -240,7 +242,7 @@ async def userinfo(ctx):
 
     embed = hikari.Embed(title=f"{username}'s latest submissions", color=0xFFFF00)
     for submission in submissions:
-        problem = submission.problem[0]
+        problem = submission.problem
         if problem.points is not None:
             points = str(int(problem.points)) + "p"
             if problem.partial:
@@ -248,10 +250,10 @@ async def userinfo(ctx):
         else:
             points = "???"
 
-        true_short_name = submission.language[0].short_name
+        true_short_name = submission.language.short_name
         if true_short_name == "":
             # wtf dmoj
-            true_short_name = submission.language[0].key
+            true_short_name = submission.language.key
 
         embed.add_field(
             name="%s / %s" % (str(submission.score_num), str(submission.score_denom)),
@@ -260,14 +262,14 @@ async def userinfo(ctx):
         )
 
         embed.add_field(
-            name="%s (%s)" % (submission.problem[0].name, points),
+            name="%s (%s)" % (submission.problem.name, points),
             value="%s | [Problem](https://dmoj.ca/problem/%s)"
             % (
                 submission.date.astimezone(TZ)
                 .strftime("%b. %d, %Y, %I:%M %p")
                 .replace("AM", "a.m.")
                 .replace("PM", "p.m."),
-                submission.problem[0].code,
+                submission.problem.code,
             ),
             # Jan. 13, 2021, 12:17 a.m.
             # %b. %d, %Y, %I:%M %p
@@ -338,7 +340,7 @@ async def predict(ctx):
     problems_ACed = dict()
     code_to_points = dict()
     for submission in submissions:
-        code = submission.problem[0].code
+        code = submission.problem.code
         points = submission.points
         result = submission.result
 
@@ -388,6 +390,7 @@ async def predict(ctx):
     required=False,
     default=[],
 )
+@lightbulb.add_checks(problems_ready)
 @lightbulb.command("vc", "Suggest a contest")
 @lightbulb.implements(lightbulb.PrefixCommand, lightbulb.SlashCommand)
 async def vc(ctx):
@@ -408,23 +411,12 @@ async def vc(ctx):
     q = session.query(Contest_DB)
     for user in users:
         # if the user has attempted any problems from the problem set
-        sub_q = (
-            session.query(Submission_DB, func.max(Submission_DB.points))
-            .filter(Submission_DB._user == user.username)
-            .group_by(Submission_DB._code)
-            .subquery()
-        )
-        sub_q = (
-            session.query(Problem_DB.code)
-            .join(sub_q, Problem_DB.code == sub_q.c._code, isouter=True)
-            .filter(func.ifnull(sub_q.c.points, 0) != 0)
-        )
-        sub_q = list(map(itemgetter(0), sub_q.all()))
+        attempted = list(solved_cache.attempted(user.username))
         q = (
-            q.filter(not_(Contest_DB.rankings.contains(user.username)))
-            .filter(~Contest_DB.problems.any(Problem_DB.code.in_(sub_q)))
-            .filter(Contest_DB.is_private == 0)
-            .filter(Contest_DB.is_organization_private == 0)
+            q.filter(not_(json_contains(Contest_DB.rankings, user.username, key="user")))
+            .filter(~Contest_DB.problems.any(Problem_DB.code.in_(attempted)))
+            .filter(Contest_DB.is_private.is_(False))
+            .filter(Contest_DB.is_organization_private.is_(False))
         )
 
     if q.count() == 0:
@@ -498,6 +490,7 @@ async def gimmie(ctx):
     - regex
     - string"""
 )
+@lightbulb.add_checks(problems_ready)
 @lightbulb.command("gimme", "Recommend a problem")
 @lightbulb.implements(lightbulb.PrefixCommand, lightbulb.SlashCommand)
 async def gimme(ctx):
@@ -559,6 +552,7 @@ async def gimme(ctx):
 @lightbulb.set_help(
     "Usage: [username] [p<=points, p>=points]\nUse surround your username with '' if it can be interpreted as a number"
 )
+@lightbulb.add_checks(problems_ready)
 @lightbulb.command("solved", "Shows a user's last solved problems (Adelaide command)", aliases=["stalk", "sp"])
 @lightbulb.implements(lightbulb.PrefixCommand)
 async def solved(ctx):
@@ -574,7 +568,7 @@ async def solved(ctx):
             maxP = min(maxP, int(arg[3:]))
         else:
             username = arg
-    username = (await query.get_user(username)).username
+    username = (await query.get_user(username, stale=True)).username
     if username is None:
         username = query.get_handle(ctx.author.id, ctx.get_guild().id)
     await query.get_submissions(username, result="AC")
@@ -585,8 +579,8 @@ async def solved(ctx):
         .filter(Submission_DB.result == "AC")
         .options(orm.joinedload(Submission_DB.problem, innerjoin=True))
         .join(Submission_DB.problem)
-        .filter(Problem_DB.is_organization_private == 0)
-        .filter(Problem_DB.is_public == 1)
+        .filter(Problem_DB.is_organization_private.is_(False))
+        .filter(Problem_DB.is_public.is_(True))
         .order_by(Submission_DB.date)
         .all()
     )
@@ -602,7 +596,7 @@ async def solved(ctx):
 
     for sub in uniqueSubmissions:
         age = (datetime.now() - sub.date).days
-        pag.add_line(f"[{sub.problem[0].name}]({SITE_URL}/problem/{sub._code}) [{sub.points}] ({age} days ago)")
+        pag.add_line(f"[{sub.problem.name}]({SITE_URL}/problem/{sub._code}) [{sub.points}] ({age} days ago)")
 
     if len(uniqueSubmissions) == 0:
         pag.add_line("No submission")
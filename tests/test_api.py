@@ -1,6 +1,11 @@
 import unittest
-from utils.api import API, ObjectNotFound
+from utils.api import API, ObjectNotFound, iter_pages, SharedRateLimiter, get_rating_predictions
+from unittest import mock
+from benchmarks.fake_dmoj import FakeDMOJ
+import aiohttp
 import asyncio
+import multiprocessing
+import time
 
 # Shrug
 # https://stackoverflow.com/questions/23033939/how-to-test-python-3-4-asyncio-code
@@ -8,10 +13,7 @@ import asyncio
 
 def async_test(f):
     def wrapper(*args, **kwargs):
-        coro = asyncio.coroutine(f)
-        future = coro(*args, **kwargs)
-        loop = asyncio.get_event_loop()
-        loop.run_until_complete(future)
+        asyncio.run(f(*args, **kwargs))
 
     return wrapper
 
@@ -72,5 +74,141 @@ class APITest(unittest.TestCase):
             await self.api.parse(data, object)
 
 
+class IterPagesTest(unittest.TestCase):
+    class APIMock:
+        # Set when a page is requested, and by the test to let it finish
+        started = {}
+        release = {}
+        in_flight = 0
+        max_seen = 0
+
+        async def get_things(self, page):
+            cls = IterPagesTest.APIMock
+            cls.in_flight += 1
+            cls.max_seen = max(cls.max_seen, cls.in_flight)
+            cls.started[page].set()
+            await cls.release[page].wait()
+            cls.in_flight -= 1
+            self.page = page
+
+    def setUp(self):
+        self.APIMock.in_flight = self.APIMock.max_seen = 0
+
+    @async_test
+    async def test_iter_pages(self):
+        mock_api = self.APIMock
+        mock_api.started = {page: asyncio.Event() for page in range(1, 8)}
+        mock_api.release = {page: asyncio.Event() for page in range(1, 8)}
+        results = asyncio.Queue()
+
+        async def consume():
+            async for result in iter_pages(mock_api.get_things, range(1, 8), max_in_flight=3):
+                self.assertLessEqual(mock_api.in_flight, 3)
+                await results.put(result.page)
+
+        async def wait(event):
+            await asyncio.wait_for(event.wait(), timeout=5)
+
+        with mock.patch("utils.api.API", mock_api):
+            consumer = asyncio.ensure_future(consume())
+            for page in range(1, 4):
+                await wait(mock_api.started[page])
+            self.assertFalse(mock_api.started[4].is_set())
+
+            # Later pages finishing first are yielded first, and only then is the next page requested
+            mock_api.release[3].set()
+            self.assertEqual(await asyncio.wait_for(results.get(), timeout=5), 3)
+            await wait(mock_api.started[4])
+            self.assertFalse(mock_api.started[5].is_set())
+
+            pages = [3]
+            for page in [2, 1, 4, 5, 6, 7]:
+                await wait(mock_api.started[page])
+                mock_api.release[page].set()
+                pages.append(await asyncio.wait_for(results.get(), timeout=5))
+            await asyncio.wait_for(consumer, timeout=5)
+
+        self.assertEqual(pages, [3, 2, 1, 4, 5, 6, 7])
+        self.assertEqual(mock_api.max_seen, 3)
+
+
+def throttled_calls(limiter, calls, times):
+    async def call():
+        async with limiter.throttle():
+            times.put(time.time())
+
+    async def run():
+        await asyncio.gather(*[call() for _ in range(calls)])
+
+    asyncio.run(run())
+
+
+class RatingPredictionsTest(unittest.TestCase):
+    @async_test
+    async def test_get_rating_predictions(self):
+        server = FakeDMOJ(problems=10, users=10, contests=2, participants=20)
+        url = await server.start()
+        try:
+            with mock.patch("utils.api.RATING_PREDICTIONS_URL", url + "rating/contest/{key}/api"):
+                rankings = await get_rating_predictions("fixture_contest0")
+                self.assertTrue(rankings)
+                for ranking in rankings.values():
+                    self.assertEqual(ranking["new_rating"] - ranking["old_rating"], ranking["rating_change"])
+                # No predictions for the contest
+                self.assertEqual(await get_rating_predictions("fixture_contest5"), {})
+        finally:
+            await server.close()
+
+    @async_test
+    async def test_get_rating_predictions_unavailable(self):
+        server = FakeDMOJ(problems=10, users=10, contests=2, participants=20, latency=1)
+        url = await server.start()
+        try:
+            with mock.patch("utils.api.RATING_PREDICTIONS_URL", url + "rating/contest/{key}/api"), mock.patch(
+                "utils.api.RATING_PREDICTIONS_TIMEOUT", aiohttp.ClientTimeout(total=0.1)
+            ):
+                self.assertEqual(await get_rating_predictions("fixture_contest0"), {})
+        finally:
+            await server.close()
+        # Nothing listening anymore
+        with mock.patch("utils.api.RATING_PREDICTIONS_URL", url + "rating/contest/{key}/api"):
+            self.assertEqual(await get_rating_predictions("fixture_contest0"), {})
+
+
+class SharedRateLimiterTest(unittest.TestCase):
+    def test_shared_between_processes(self):
+        context = multiprocessing.get_context("fork")
+        limiter = SharedRateLimiter(rate_limit=20, concurrency_limit=2, context=context)
+        times = context.Queue()
+        workers = [context.Process(target=throttled_calls, args=(limiter, 4, times)) for _ in range(2)]
+        for worker in workers:
+            worker.start()
+        stamps = sorted(times.get(timeout=10) for _ in range(8))
+        for worker in workers:
+            worker.join()
+        gaps = [later - earlier for earlier, later in zip(stamps, stamps[1:])]
+        # 20 requests per second across both processes, minus some scheduling slack
+        self.assertGreaterEqual(min(gaps), 1 / 20 - 0.01)
+
+    @async_test
+    async def test_lock_held_elsewhere(self):
+        limiter = SharedRateLimiter(rate_limit=20, concurrency_limit=2)
+        # Another process is taking a slot
+        limiter.lock.acquire()
+        entered = asyncio.Event()
+
+        async def call():
+            async with limiter.throttle():
+                entered.set()
+
+        task = asyncio.ensure_future(call())
+        # The event loop keeps running while throttle waits for the lock
+        await asyncio.sleep(0.05)
+        self.assertFalse(entered.is_set())
+        limiter.lock.release()
+        await asyncio.wait_for(task, 1)
+        self.assertTrue(entered.is_set())
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+import json
+from unittest import mock
+from utils import codec
+
+
+class CodecTest(unittest.TestCase):
+    def test_roundtrip(self):
+        obj = {"key": "abc", "rankings": [{"user": "a", "score": 1.5, "solutions": [None, {"points": 3}]}]}
+        for name, load in codec.CODECS.items():
+            try:
+                loads, dumps = load()
+            except ImportError:
+                continue
+            with self.subTest(codec=name):
+                self.assertEqual(loads(dumps(obj)), obj)
+                self.assertEqual(loads(dumps(obj).encode()), obj)
+                self.assertEqual(json.loads(dumps(obj)), obj)
+
+    def test_fallback(self):
+        # Stdlib json turns int keys into strings, faster codecs refuse them
+        self.assertEqual(codec.loads(codec.dumps({1: 2})), {"1": 2})
+
+    def test_unknown_name(self):
+        with self.assertLogs("utils.codec", "WARNING"):
+            name, loads, dumps = codec._load("ujsn")
+        self.assertEqual(name, "json")
+        self.assertEqual(loads(dumps({"a": 1})), {"a": 1})
+
+    def test_not_installed(self):
+        with mock.patch.dict(codec.CODECS, {"orjson": mock.Mock(side_effect=ImportError)}):
+            with self.assertLogs("utils.codec", "WARNING"):
+                self.assertEqual(codec._load("orjson")[0], "json")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+import os
+from sqlalchemy import create_engine, func, not_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+from utils import codec
+from utils.db import Base, Problem, Contest, Submission, json_contains
+
+POSTGRES_URI = os.environ.get("JOMD_TEST_POSTGRES_URI")
+
+
+class QueryMixin:
+    """Queries that have to behave the same on every backend, run against self.engine"""
+
+    def setUp(self):
+        Base.metadata.create_all(self.engine)
+        self.session = sessionmaker(bind=self.engine)()
+        # The models' constructors take API objects, so rows go in through the tables
+        self.session.execute(
+            Problem.__table__.insert(),
+            [
+                {"code": "a", "types": ["Graph Theory", "Ad Hoc"], "points": 5, "is_public": True},
+                {"code": "b", "types": ["Graph Theory Advanced"], "points": 10, "is_public": True},
+                {"code": "c", "types": [], "points": 3, "is_public": False},
+            ],
+        )
+        self.session.execute(
+            Contest.__table__.insert(),
+            [
+                {"key": "x", "tags": ["dmopc"], "rankings": [{"user": "bob"}, {"user": "alice"}], "is_rated": True},
+                {"key": "y", "tags": [], "rankings": [{"user": "bobby"}], "is_rated": False},
+            ],
+        )
+        self.session.execute(
+            Submission.__table__.insert(),
+            [
+                {"id": 1, "_code": "a", "_user": "bob", "points": 5},
+                {"id": 2, "_code": "a", "_user": "bob", "points": 2},
+                {"id": 3, "_code": "b", "_user": "bob", "points": None},
+            ],
+        )
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+        Base.metadata.drop_all(self.engine)
+
+    def codes(self, *conds):
+        return sorted(code for (code,) in self.session.query(Problem.code).filter(*conds))
+
+    def keys(self, *conds):
+        return sorted(key for (key,) in self.session.query(Contest.key).filter(*conds))
+
+    def test_json_contains_element(self):
+        self.assertEqual(self.codes(json_contains(Problem.types, "Graph Theory")), ["a"])
+        self.assertEqual(self.codes(not_(json_contains(Problem.types, "Ad Hoc"))), ["b", "c"])
+        self.assertEqual(self.keys(json_contains(Contest.tags, "dmopc")), ["x"])
+
+    def test_json_contains_key(self):
+        self.assertEqual(self.keys(json_contains(Contest.rankings, "bob", key="user")), ["x"])
+        self.assertEqual(self.keys(not_(json_contains(Contest.rankings, "bob", key="user"))), ["y"])
+
+    def test_booleans(self):
+        self.assertEqual(self.codes(Problem.is_public.is_(True)), ["a", "b"])
+        self.assertEqual(self.keys(Contest.is_rated.is_(False)), ["y"])
+
+    def test_best_points(self):
+        sub_q = (
+            self.session.query(Submission._code, func.max(Submission.points).label("points"))
+            .filter(Submission._user == "bob")
+            .group_by(Submission._code)
+            .subquery()
+        )
+        q = (
+            self.session.query(Problem.code, func.coalesce(sub_q.c.points, 0))
+            .join(sub_q, Problem.code == sub_q.c._code, isouter=True)
+            .order_by(Problem.code)
+        )
+        self.assertEqual(q.all(), [("a", 5), ("b", 0), ("c", 0)])
+
+    def test_json_roundtrip(self):
+        self.session.expunge_all()
+        self.assertEqual(self.session.query(Contest).get("x").rankings, [{"user": "bob"}, {"user": "alice"}])
+
+
+class SqliteTest(QueryMixin, unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        super().setUp()
+
+
+@unittest.skipUnless(POSTGRES_URI, "JOMD_TEST_POSTGRES_URI is not set")
+class PostgresTest(QueryMixin, unittest.TestCase):
+    def setUp(self):
+        self.engine = create_engine(POSTGRES_URI, json_serializer=codec.dumps, json_deserializer=codec.loads)
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        self.engine.dispose()
+
+
+class PostgresCompileTest(unittest.TestCase):
+    def test_containment(self):
+        sql = str(json_contains(Contest.rankings, "bob", key="user").compile(dialect=postgresql.dialect()))
+        self.assertIn("contest.rankings @> CAST(", sql)
+        self.assertIn("AS JSONB)", sql)
+
+
+if __name__ == "__main__":
+    unittest.main()
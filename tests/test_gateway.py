@@ -0,0 +1,22 @@
+import unittest
+from types import SimpleNamespace
+from utils.gateway import owns_guilds
+
+
+def guild(shard, shard_count):
+    # Discord puts a guild on shard (id >> 22) % shard_count
+    return (shard + shard_count) << 22
+
+
+class OwnsGuildsTest(unittest.TestCase):
+    def test_lowest_shard_owns(self):
+        app = SimpleNamespace(shard_count=4, shards={2: None, 3: None})
+        self.assertTrue(owns_guilds(app, [guild(2, 4)]))
+        self.assertTrue(owns_guilds(app, [guild(3, 4), guild(2, 4)]))
+        self.assertFalse(owns_guilds(app, [guild(0, 4)]))
+        # Left to the process running shard 1
+        self.assertFalse(owns_guilds(app, [guild(1, 4), guild(3, 4)]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import importlib
+import os
+import unittest
+from collections import namedtuple
+from unittest import mock
+from utils import constants
+from utils.leaderboard import Ranking, Leaderboards, GitgudRankings, UNRATED
+
+User = namedtuple("User", ["username", "rating", "max_rating", "performance_points", "problem_count"])
+
+
+class RankingTest(unittest.TestCase):
+    def setUp(self):
+        self.ranking = Ranking()
+        for member, key in [("a", -10), ("b", -30), ("c", -20), ("d", -20)]:
+            self.ranking.update(member, key)
+
+    def test_order(self):
+        self.assertEqual([member for _, member in self.ranking], ["b", "c", "d", "a"])
+        self.assertEqual(self.ranking.page(1, 2), [(-20, "c"), (-20, "d")])
+
+    def test_rank(self):
+        self.assertEqual(self.ranking.rank("b"), 1)
+        self.assertEqual(self.ranking.rank("d"), 3)
+        self.assertIsNone(self.ranking.rank("e"))
+
+    def test_update_and_remove(self):
+        self.ranking.update("a", -40)
+        self.assertEqual(self.ranking.rank("a"), 1)
+        self.assertEqual(len(self.ranking), 4)
+        self.ranking.remove("b")
+        self.ranking.remove("b")
+        self.assertEqual([member for _, member in self.ranking], ["a", "c", "d"])
+
+
+class LeaderboardsTest(unittest.TestCase):
+    def setUp(self):
+        self.leaderboards = Leaderboards()
+        self.leaderboards.build(
+            1,
+            [
+                User("alice", 2000, 2100, 300.5, 200),
+                User("bob", None, None, 100.0, 50),
+                User("carol", 1500, 2500, 200.0, 400),
+            ],
+        )
+        self.leaderboards.build(2, [User("alice", 2000, 2100, 300.5, 200)])
+
+    def test_metrics(self):
+        self.assertEqual([m for _, m in self.leaderboards.get(1, "rating")], ["alice", "carol", "bob"])
+        self.assertEqual([m for _, m in self.leaderboards.get(1, "maxrating")], ["carol", "alice", "bob"])
+        self.assertEqual([m for _, m in self.leaderboards.get(1, "solved")], ["carol", "alice", "bob"])
+        self.assertEqual(self.leaderboards.get(1, "rating").page(2, 1), [(-UNRATED, "bob")])
+
+    def test_update_user(self):
+        self.leaderboards.update_user(User("bob", 2200, 2200, 100.0, 50))
+        self.assertEqual(self.leaderboards.get(1, "rating").rank("bob"), 1)
+        self.leaderboards.update_user(User("alice", 1000, 2100, 300.5, 200))
+        self.assertEqual(self.leaderboards.get(1, "rating").rank("alice"), 3)
+        self.assertEqual(self.leaderboards.get(2, "rating").page(0, 1), [(-1000, "alice")])
+
+    def test_add_remove(self):
+        self.leaderboards.add(2, User("dave", 3000, 3000, 10.0, 1))
+        self.assertEqual(self.leaderboards.get(2, "rating").rank("dave"), 1)
+        self.leaderboards.remove(2, "alice")
+        self.assertNotIn("alice", self.leaderboards.get(2, "points"))
+        self.leaderboards.update_user(User("alice", 4000, 4000, 300.5, 200))
+        self.assertNotIn("alice", self.leaderboards.get(2, "rating"))
+        self.assertEqual(self.leaderboards.get(1, "rating").rank("alice"), 1)
+
+
+class GitgudRankingsTest(unittest.TestCase):
+    def test_update(self):
+        rankings = GitgudRankings()
+        rankings.build(1, [("alice", 20), ("bob", 35)])
+        rankings.update(1, "alice", 40)
+        rankings.update(1, "carol", 10)
+        # Not built, read from the db on first use instead
+        rankings.update(2, "alice", 40)
+        self.assertEqual(rankings.get(1).page(0, 3), [(-40, "alice"), (-35, "bob"), (-10, "carol")])
+        self.assertEqual(rankings.get(1).rank("bob"), 2)
+        self.assertNotIn(2, rankings._guilds)
+
+    @mock.patch("utils.leaderboard.CACHE_TTL", 60)
+    def test_rebuilt_after_ttl(self):
+        rankings = GitgudRankings()
+        rankings.build(1, [("alice", 20)])
+        with mock.patch("utils.leaderboard.session") as session:
+            # Another shard process gave bob points
+            session.query.return_value.filter.return_value = [("alice", 20), ("bob", 35)]
+            self.assertEqual(rankings.get(1).rank("bob"), None)
+            with mock.patch("utils.leaderboard.time.monotonic", return_value=rankings._built[1] + 3600):
+                self.assertEqual(rankings.get(1).rank("bob"), 1)
+
+    def test_kept_with_one_process(self):
+        env = {key: value for key, value in os.environ.items() if key not in ["JOMD_CACHE_TTL", "JOMD_SHARD_COUNT"]}
+        try:
+            with mock.patch.dict(os.environ, env, clear=True):
+                self.assertEqual(importlib.reload(constants).CACHE_TTL, 0)
+                os.environ["JOMD_SHARD_COUNT"] = "4"
+                self.assertEqual(importlib.reload(constants).CACHE_TTL, 60)
+        finally:
+            importlib.reload(constants)
+
+        rankings = GitgudRankings()
+        rankings.build(1, [("alice", 20)])
+        with mock.patch("utils.leaderboard.CACHE_TTL", 0), mock.patch("utils.leaderboard.session") as session:
+            session.query.return_value.filter.return_value = [("alice", 20), ("bob", 35)]
+            with mock.patch("utils.leaderboard.time.monotonic", return_value=rankings._built[1] + 3600):
+                self.assertEqual(rankings.get(1).rank("bob"), None)
+
+
+if __name__ == "__main__":
+    unittest.main()
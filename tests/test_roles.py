@@ -0,0 +1,60 @@
+import unittest
+from collections import namedtuple
+from utils.roles import RoleIndex
+
+Role = namedtuple("Role", ["id", "guild_id", "name"])
+
+
+class GuildMock:
+    def __init__(self, id, roles):
+        self.id = id
+        self.roles = roles
+        self.calls = 0
+
+    def get_roles(self):
+        self.calls += 1
+        return {role.id: role for role in self.roles}
+
+
+class RoleIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = RoleIndex()
+        self.guild = GuildMock(1, [Role(10, 1, "Expert"), Role(11, 1, "Newbie"), Role(12, 1, "Admin")])
+
+    def test_build_on_first_lookup(self):
+        self.assertEqual(self.index.get_role(self.guild, "Admin").id, 12)
+        self.assertIsNone(self.index.get_role(self.guild, "Master"))
+        self.assertEqual(self.guild.calls, 1)
+
+    def test_rank_roles(self):
+        ranks = self.index.get_rank_roles(self.guild)
+        self.assertEqual(set(ranks), {"Expert", "Newbie"})
+
+    def test_events(self):
+        self.index.get_role(self.guild, "Admin")
+        self.index.add(Role(13, 1, "Master"))
+        self.assertEqual(self.index.get_role(self.guild, "Master").id, 13)
+        # Rename
+        self.index.add(Role(13, 1, "Grandmaster"))
+        self.assertIsNone(self.index.get_role(self.guild, "Master"))
+        self.assertEqual(self.index.get_role(self.guild, "Grandmaster").id, 13)
+        self.index.remove(1, 10)
+        self.assertIsNone(self.index.get_role(self.guild, "Expert"))
+        self.assertEqual(self.guild.calls, 1)
+
+    def test_duplicate_names(self):
+        self.index.get_role(self.guild, "Admin")
+        self.index.add(Role(14, 1, "Admin"))
+        self.assertEqual(self.index.get_role(self.guild, "Admin").id, 12)
+        self.index.remove(1, 12)
+        self.assertEqual(self.index.get_role(self.guild, "Admin").id, 14)
+
+    def test_unknown_guild_event_ignored(self):
+        self.index.add(Role(20, 2, "Admin"))
+        self.index.remove(2, 20)
+        guild = GuildMock(2, [Role(21, 2, "Admin")])
+        self.assertEqual(self.index.get_role(guild, "Admin").id, 21)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+from utils.search import ProblemIndex, trigrams
+
+
+class TrigramTest(unittest.TestCase):
+    def test_trigrams(self):
+        self.assertEqual(trigrams("Ab"), {"  a", " ab", "ab "})
+        self.assertEqual(trigrams("a-b"), trigrams("A B"))
+        self.assertEqual(trigrams("!!"), set())
+
+
+class ProblemIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = ProblemIndex()
+        self.index.build(
+            [
+                ("aplusb", "A Plus B"),
+                ("ccc15s1", "CCC '15 S1 - Zero That Out"),
+                ("ccc15s2", "CCC '15 S2 - Jerseys"),
+                ("dmopc14c1p1", "DMOPC '14 Contest 1 P1 - Sawmill Scheme"),
+                ("graph1", "Graph Theory Practice"),
+            ]
+        )
+
+    def test_exact(self):
+        self.assertEqual(self.index.search("aplusb")[0], "aplusb")
+        self.assertEqual(self.index.search("a plus b")[0], "aplusb")
+        self.assertEqual(self.index.search("ccc15s2")[0], "ccc15s2")
+
+    def test_fuzzy(self):
+        self.assertEqual(self.index.search("jersey"), ["ccc15s2"])
+        self.assertEqual(self.index.search("sawmil sceme")[0], "dmopc14c1p1")
+        self.assertEqual(set(self.index.search("ccc 15", limit=2)), {"ccc15s1", "ccc15s2"})
+        self.assertEqual(self.index.search("xyzzy"), [])
+
+    def test_add_remove(self):
+        self.index.add("graph1", "Shortest Paths")
+        self.assertEqual(self.index.search("theory practice"), [])
+        self.assertEqual(self.index.search("shortest path"), ["graph1"])
+        self.index.remove("graph1")
+        self.assertEqual(self.index.search("shortest path"), [])
+        self.assertEqual(len(self.index), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
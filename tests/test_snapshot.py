@@ -0,0 +1,62 @@
+import unittest
+import os
+import tempfile
+from datetime import datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from utils.db import Base, Problem, Contest, contest_problem
+from utils import snapshot
+
+
+class SnapshotTest(unittest.TestCase):
+    def session(self):
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        return sessionmaker(bind=engine)()
+
+    def setUp(self):
+        self.source = self.session()
+        self.source.execute(
+            Problem.__table__.insert(),
+            [
+                {"code": "a", "name": "A", "types": ["Ad Hoc"], "points": 5, "partial": True, "is_public": True},
+                {"code": "b", "name": None, "types": [], "points": 10, "partial": False, "is_public": False},
+            ],
+        )
+        self.source.execute(
+            Contest.__table__.insert(),
+            [{"key": "x", "start_time": datetime(2021, 1, 2, 3, 4, 5), "rankings": [{"user": "bob", "score": 1.5}]}],
+        )
+        self.source.execute(contest_problem.insert(), [{"contest_id": "x", "problem_id": "a"}])
+        self.source.commit()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "seed.json.gz")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_roundtrip(self):
+        counts = snapshot.dump(self.path, session=self.source)
+        self.assertEqual(counts["problem"], 2)
+        self.assertEqual(counts["language"], 0)
+
+        target = self.session()
+        counts = snapshot.load(self.path, session=target)
+        self.assertEqual((counts["problem"], counts["contest"], counts["contest_problem"]), (2, 1, 1))
+
+        problems = target.query(Problem.code, Problem.name, Problem.types, Problem.partial).order_by(Problem.code)
+        self.assertEqual(problems.all(), [("a", "A", ["Ad Hoc"], True), ("b", None, [], False)])
+        contest = target.query(Contest).one()
+        self.assertEqual(contest.start_time, datetime(2021, 1, 2, 3, 4, 5))
+        self.assertEqual(contest.rankings, [{"user": "bob", "score": 1.5}])
+        self.assertEqual([problem.code for problem in contest.problems], ["a"])
+
+    def test_skips_existing(self):
+        snapshot.dump(self.path, session=self.source)
+        counts = snapshot.load(self.path, session=self.source)
+        self.assertEqual(sum(counts.values()), 0)
+        self.assertEqual(self.source.query(contest_problem).count(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
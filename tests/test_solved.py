@@ -0,0 +1,61 @@
+import unittest
+from collections import namedtuple
+from types import SimpleNamespace
+from utils.solved import ProblemSet, SolvedCache
+
+Problem = namedtuple("Problem", ["code", "points"])
+User = namedtuple("User", ["username", "solved_problems"])
+
+
+def Submission(user, code, problem, points):
+    return SimpleNamespace(_user=user, _problem=code, problem=problem, points=points)
+
+
+class ProblemSetTest(unittest.TestCase):
+    def test_membership(self):
+        codes = [f"problem{i}" for i in range(20)]
+        problems = ProblemSet(codes[::3])
+        problems.add("problem0")
+        self.assertEqual(len(problems), 7)
+        self.assertIn("problem3", problems)
+        self.assertNotIn("problem4", problems)
+        self.assertNotIn("never_seen", problems)
+        self.assertEqual(sorted(problems), sorted(codes[::3]))
+        # Numbered past the end of this bitmap by another set
+        ProblemSet(["problem_late"])
+        self.assertNotIn("problem_late", problems)
+
+
+class SolvedCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = SolvedCache()
+        self.cache.build("bob", ["a"], ["b"])
+
+    def test_build(self):
+        self.assertEqual(sorted(self.cache.solved("bob")), ["a"])
+        self.assertEqual(sorted(self.cache.attempted("bob")), ["a", "b"])
+        self.assertTrue(self.cache.has_solved("bob", "a"))
+        self.assertFalse(self.cache.has_solved("bob", "b"))
+
+    def test_add_submissions(self):
+        self.cache.add_submissions(
+            [
+                Submission("bob", "c", Problem("c", 10), 10.0),
+                Submission("bob", "d", Problem("d", 10), 4.0),
+                Submission("bob", "e", Problem("e", 10), 0.0),
+                # Not loaded, read from the db on first use instead
+                Submission("alice", "c", Problem("c", 10), 10.0),
+            ]
+        )
+        self.assertEqual(sorted(self.cache.solved("bob")), ["a", "c"])
+        self.assertEqual(sorted(self.cache.attempted("bob")), ["a", "b", "c", "d"])
+        self.assertNotIn("alice", self.cache._users)
+
+    def test_update_user(self):
+        self.cache.update_user(User("bob", [Problem("f", 5)]))
+        self.assertIn("f", self.cache.solved("bob"))
+        self.assertIn("f", self.cache.attempted("bob"))
+
+
+if __name__ == "__main__":
+    unittest.main()
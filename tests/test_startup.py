@@ -0,0 +1,22 @@
+import unittest
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+class StartupTest(unittest.TestCase):
+    def test_no_heavy_imports(self):
+        # Plotting and html parsing are imported by the commands that use them, not at startup
+        script = (
+            "import sys, Main; Main.create_bot('test'); "
+            "heavy = {m.split('.')[0] for m in sys.modules} & {'matplotlib', 'pandas', 'seaborn', 'bs4'}; "
+            "print(' '.join(sorted(heavy)))"
+        )
+        proc = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True)
+        self.assertEqual(proc.stdout.strip(), "")
+
+
+if __name__ == "__main__":
+    unittest.main()
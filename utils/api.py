@@ -1,16 +1,25 @@
 # from utils.submission import Submission
 # from utils.problem import Problem
-from bs4 import BeautifulSoup
-from utils.constants import SITE_URL, API_TOKEN
+from utils.constants import (
+    SITE_URL,
+    API_TOKEN,
+    MAX_PAGES_IN_FLIGHT,
+    API_RATE_LIMIT,
+    API_CONCURRENCY_LIMIT,
+    RATING_PREDICTIONS_URL,
+)
 import urllib.parse
 import functools
+import itertools
 import aiohttp
 import asyncio
+import multiprocessing
 import time
 import html
 import math
 from datetime import datetime
 from utils.db import session
+from utils import codec
 from utils.db import (
     Problem as Problem_DB,
     Contest as Contest_DB,
@@ -114,15 +123,68 @@ class RateLimiter:
                 raise
 
 
+class SharedRateLimiter:
+    """
+    Same throttle() as RateLimiter but the limits are shared by every process it is passed to,
+    used when the bot runs shards in several worker processes. Each request takes the next free
+    slot on a shared clock, so all workers together stay under rate_limit requests per second
+    """
+
+    # Seconds between tries for the lock while another process holds it
+    LOCK_POLL_INTERVAL = 0.001
+
+    def __init__(self, rate_limit: int, concurrency_limit: int, context=multiprocessing) -> None:
+        if not rate_limit or rate_limit < 1:
+            raise ValueError("rate limit must be non zero positive number")
+        if not concurrency_limit or concurrency_limit < 1:
+            raise ValueError("concurrent limit must be non zero positive number")
+
+        self.interval = 1 / rate_limit
+        self.lock = context.Lock()
+        # time.time() of the next free slot
+        self.next_slot = context.Value("d", 0.0, lock=False)
+        self.semaphore = context.BoundedSemaphore(concurrency_limit)
+
+    def reserve(self) -> typing.Optional[float]:
+        """Take the next slot and return how long to wait for it, None if another process holds the lock"""
+        if not self.lock.acquire(False):
+            return None
+        try:
+            now = time.time()
+            slot = max(now, self.next_slot.value)
+            self.next_slot.value = slot + self.interval
+        finally:
+            self.lock.release()
+        return slot - now
+
+    @asynccontextmanager
+    async def throttle(self):
+        # multiprocessing primitives block, so poll instead of stalling the event loop
+        while not self.semaphore.acquire(False):
+            await asyncio.sleep(self.interval / 4)
+        try:
+            wait = self.reserve()
+            while wait is None:
+                # Only held for a few instructions
+                await asyncio.sleep(self.LOCK_POLL_INTERVAL)
+                wait = self.reserve()
+            await asyncio.sleep(wait)
+            yield
+        finally:
+            self.semaphore.release()
+
+
 rate_limiter = None
 _session = None
+# Without predictions +ranklist still shows the scores, so don't wait long
+RATING_PREDICTIONS_TIMEOUT = aiohttp.ClientTimeout(total=10)
 
 
 async def _query_api(url, resp_obj):
     global _session, rate_limiter
     if rate_limiter is None:
         # Allow at most 3 concurrent requests tokens are emptied at 1 per second
-        rate_limiter = RateLimiter(rate_limit=1, concurrency_limit=3)
+        rate_limiter = RateLimiter(rate_limit=API_RATE_LIMIT, concurrency_limit=API_CONCURRENCY_LIMIT)
 
     async with rate_limiter.throttle():
         start = time.time()
@@ -136,7 +198,7 @@ async def _query_api(url, resp_obj):
             if resp_obj == "text":
                 resp = await resp.text()
             if resp_obj == "json":
-                resp = await resp.json()
+                resp = await resp.json(loads=codec.loads)
             # if 'error' in resp:  ApiError would interfere with some other stuff,
             # might just change to error trapping
             #     raise ApiError
@@ -144,7 +206,78 @@ async def _query_api(url, resp_obj):
     return resp
 
 
+async def get_rating_predictions(contest_key: str) -> dict:
+    """Predicted rating changes by username, empty if evanzhang.ca has none for the contest or is down"""
+    # Not DMOJ, so neither its rate limit nor the api token apply
+    try:
+        async with aiohttp.ClientSession(timeout=RATING_PREDICTIONS_TIMEOUT) as client:
+            async with client.get(RATING_PREDICTIONS_URL.format(key=contest_key)) as resp:
+                if resp.status != 200:
+                    return {}
+                return (await resp.json(loads=codec.loads, content_type=None))["users"]
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.warning("Fetching rating predictions for %s failed: %r", contest_key, e)
+        return {}
+
+
+def _soup(text):
+    # bs4 and html5lib are only needed for the few pages without an API endpoint
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(text, features="html5lib")
+
+
+async def iter_pages(method, pages, max_in_flight: int = MAX_PAGES_IN_FLIGHT, **params):
+    """
+    Call an API list method, e.g. API.get_submissions, for each of pages and yield the API
+    objects in the order they finish. At most max_in_flight pages are requested or waiting to
+    be consumed at once, so memory stays bounded by the page size rather than the page count.
+    """
+
+    async def fetch(page):
+        api = API()
+        await method(api, **params, page=page)
+        return api
+
+    pages = iter(pages)
+    pending = set()
+    for page in itertools.islice(pages, max_in_flight):
+        pending.add(asyncio.ensure_future(fetch(page)))
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+                # Only request another page once this one has been consumed
+                page = next(pages, None)
+                if page is not None:
+                    pending.add(asyncio.ensure_future(fetch(page)))
+    finally:
+        for task in pending:
+            task.cancel()
+
+
 class Problem:
+    __slots__ = (
+        "code",
+        "name",
+        "types",
+        "group",
+        "points",
+        "partial",
+        "authors",
+        "time_limit",
+        "memory_limit",
+        "language_resource_limits",
+        "short_circuit",
+        "_languages",
+        "languages",
+        "is_organization_private",
+        "_organizations",
+        "organizations",
+        "is_public",
+    )
+
     def __init__(self, data):
         self.code = data["code"]
         self.name = data["name"]
@@ -203,6 +336,30 @@ class Problem:
 
 
 class Contest:
+    __slots__ = (
+        "key",
+        "name",
+        "start_time",
+        "end_time",
+        "time_limit",
+        "tags",
+        "is_rated",
+        "rate_all",
+        "has_rating",
+        "rating_floor",
+        "rating_ceiling",
+        "hidden_scoreboard",
+        "is_organization_private",
+        "_organizations",
+        "organizations",
+        "is_private",
+        "format",
+        "rankings",
+        "_problems",
+        "problems",
+        "_problem_codes",
+    )
+
     def __init__(self, data):
         self.key = data["key"]
         self.name = data["name"]
@@ -266,6 +423,19 @@ class Contest:
 
 
 class Participation:
+    __slots__ = (
+        "id",
+        "_user",
+        "user",
+        "_contest",
+        "contest",
+        "score",
+        "cumulative_time",
+        "tiebreaker",
+        "is_disqualified",
+        "virtual_participation_number",
+    )
+
     def __init__(self, data):
         self.id = data["user"] + "&" + data["contest"] + "&" + str(data["virtual_participation_number"])
         self._user = data["user"]
@@ -291,8 +461,10 @@ class Participation:
         if user.count() == 0:
             api = API()
             await api.get_user(self._user)
-            session.add(api.data.object)
-            session.commit()
+            # Another participation of the same user could have stored it while this one was fetching
+            if user.count() == 0:
+                session.add(User_DB(api.data.object))
+                session.commit()
         self.user = user.first()
 
         contest = session.query(Contest_DB).filter(Contest_DB.key == self._contest)
@@ -300,12 +472,31 @@ class Participation:
         if contest.count() == 0:
             api = API()
             await api.get_contest(self._contest)
-            session.add(api.data.object)
-            session.commit()
+            if contest.count() == 0:
+                session.add(Contest_DB(api.data.object))
+                session.commit()
         self.contest = contest.first()
 
 
 class User:
+    __slots__ = (
+        "id",
+        "username",
+        "points",
+        "performance_points",
+        "problem_count",
+        "rank",
+        "rating",
+        "max_rating",
+        "_solved_problems",
+        "solved_problems",
+        "_organizations",
+        "organizations",
+        "_contests",
+        "contests",
+        "_contest_keys",
+    )
+
     def __init__(self, data):
         self.id = data["id"]
         self.username = data["username"]
@@ -333,6 +524,9 @@ class User:
         await asyncio.gather(*to_gather)
 
     async def async_init(self):
+        if not self._solved_problems and not self._organizations and not self._contests:
+            # Summary object from /users, nothing to hydrate
+            return
         problem_qq = session.query(Problem_DB).filter(Problem_DB.code.in_(self._solved_problems))
         problem_q = session.query(Problem_DB.code).filter(Problem_DB.code.in_(self._solved_problems)).all()
         problem_q = list(map(itemgetter(0), problem_q))
@@ -387,6 +581,27 @@ class User:
 
 
 class Submission:
+    __slots__ = (
+        "id",
+        "_problem",
+        "_user",
+        "date",
+        "_language",
+        "time",
+        "memory",
+        "points",
+        "result",
+        "status",
+        "case_points",
+        "case_total",
+        "cases",
+        "score_num",
+        "score_denom",
+        "problem",
+        "user",
+        "language",
+    )
+
     def __init__(self, data):
         self.id = data["id"]
         self._problem = data["problem"]
@@ -453,7 +668,7 @@ class Submission:
                 session.add(problem)
                 problem_q[self._problem] = problem
         if self._problem in problem_q:
-            self.problem = [problem_q[self._problem]]
+            self.problem = problem_q[self._problem]
 
         if self._user not in user_q and self._user not in lock_table:
             lock_table[self._user] = asyncio.Lock()
@@ -464,7 +679,7 @@ class Submission:
                 session.add(user)
                 user_q[self._user] = user
         if self._user in user_q:
-            self.user = [user_q[self._user]]
+            self.user = user_q[self._user]
 
         if self._language not in language_q and "language" not in lock_table:
             lock_table["language"] = asyncio.Lock()
@@ -477,22 +692,24 @@ class Submission:
                         session.add(lang)
                         language_q[language.key] = lang
         if self._language in language_q:
-            self.language = [language_q[self._language]]
+            self.language = language_q[self._language]
 
         if self.problem is None:
             async with lock_table[self._problem]:
-                self.problem = [problem_q[self._problem]]
+                self.problem = problem_q[self._problem]
 
         if self.user is None:
             async with lock_table[self._user]:
-                self.user = [user_q[self._user]]
+                self.user = user_q[self._user]
 
         if self.language is None:
             async with lock_table["language"]:
-                self.language = [language_q[self._language]]
+                self.language = language_q[self._language]
 
 
 class Organization:
+    __slots__ = ("id", "slug", "short_name", "is_open", "member_count")
+
     def __init__(self, data):
         self.id = data["id"]
         self.slug = data["slug"]
@@ -509,6 +726,8 @@ class Organization:
 
 
 class Language:
+    __slots__ = ("id", "key", "short_name", "common_name", "ace_mode_name", "pygments_name", "code_template")
+
     def __init__(self, data):
         self.id = data["id"]
         self.key = data["key"]
@@ -527,6 +746,8 @@ class Language:
 
 
 class Judge:
+    __slots__ = ("name", "start_time", "ping", "load", "languages")
+
     def __init__(self, data):
         self.name = data["name"]
         self.start_time = datetime.fromisoformat(data["start_time"])
@@ -715,17 +936,16 @@ class API:
 
     async def get_pfp(self, username: str) -> str:
         resp = await _query_api(SITE_URL + "user/" + username, "text")
-        soup = BeautifulSoup(resp, features="html5lib")
+        soup = _soup(resp)
         try:
             pfp = soup.find("img", class_="user-gravatar")["src"]
             return pfp
         except AttributeError:
             return None
 
-
     async def get_user_description(self, username: str) -> str:
         resp = await _query_api(SITE_URL + "user/" + username, "text")
-        soup = BeautifulSoup(resp, features="html5lib")
+        soup = _soup(resp)
         description = str(soup.find("div", class_="content-description"))
         return description
 
@@ -788,7 +1008,7 @@ class API:
             return ret
 
         resp = await _query_api(SITE_URL + f"submissions/user/{username}/", "text")
-        soup = BeautifulSoup(resp, features="html5lib")
+        soup = _soup(resp)
         ret = []
         for sub in soup.find_all("div", class_="submission-row")[:num]:
             ret.append(soup_parse(sub))
@@ -797,7 +1017,7 @@ class API:
 
     async def get_placement(self, username: str) -> int:
         resp = await _query_api(SITE_URL + f"user/{username}", "text")
-        soup = BeautifulSoup(resp, features="html5lib")
+        soup = _soup(resp)
         rank_str = soup.find("div", class_="user-sidebar").findChildren(recursive=False)[3].text
         rank = int(rank_str.split("#")[-1])
         return rank
@@ -0,0 +1,84 @@
+"""
+Fills an empty problem table after the bot has connected instead of before, commands that need
+the problems are guarded by problems_ready and answer with the progress until it's done
+"""
+import asyncio
+import os
+import logging
+import lightbulb
+from utils.db import session, Problem as Problem_DB
+from utils.query import Query
+from utils.search import problem_index
+from utils.constants import SEED_SNAPSHOT
+from utils import snapshot
+
+logger = logging.getLogger(__name__)
+
+
+class WarmingUp(lightbulb.errors.CheckFailure):
+    pass
+
+
+class Bootstrap:
+    def __init__(self, seed: str = SEED_SNAPSHOT):
+        self.seed = seed
+        self.ready = False
+        self.task = None
+        self.stored = 0
+        self.total_pages = None
+
+    def start(self) -> asyncio.Task:
+        # Also retries after a failed fetch
+        if self.task is None or (self.task.done() and not self.ready):
+            self.task = asyncio.create_task(self.run())
+        return self.task
+
+    async def run(self) -> None:
+        try:
+            if session.query(Problem_DB.code).first() is None:
+                if self.seed and os.path.exists(self.seed):
+                    counts = snapshot.load(self.seed)
+                    # Bulk inserts skip the mapper events that keep the index in sync
+                    problem_index.clear()
+                    logger.info("Loaded seed snapshot %s: %s", self.seed, counts)
+                    # Good enough to serve commands while get_problems catches up. That is one request when
+                    # the seed has as many problems as DMOJ lists, otherwise every page is fetched again,
+                    # /problems is ordered by code so new problems can be on any of them, and only the
+                    # missing ones are inserted
+                    self.ready = True
+                await Query().get_problems(progress=self.progress)
+            self.ready = True
+            logger.info("Problems ready")
+        except Exception:
+            logger.exception("Fetching problems failed, will retry on the next command that needs them")
+
+    async def progress(self, stored: int, total_pages: int) -> None:
+        self.stored = stored
+        self.total_pages = total_pages
+
+    def status(self) -> str:
+        if self.total_pages is None:
+            return "Still warming up, fetching the problem list from DMOJ. Try again in a minute"
+        return (
+            f"Still warming up, fetched {self.stored}/{self.total_pages} pages of problems from DMOJ. "
+            "Try again in a minute"
+        )
+
+
+bootstrap = Bootstrap()
+
+
+def _problems_ready(ctx: lightbulb.Context) -> bool:
+    if bootstrap.ready:
+        return True
+    if bootstrap.task is None:
+        # Only the process running shard 0 fetches, the others wait for it to fill the shared db
+        if session.query(Problem_DB.code).first() is not None:
+            bootstrap.ready = True
+            return True
+    else:
+        bootstrap.start()
+    raise WarmingUp(bootstrap.status())
+
+
+problems_ready = lightbulb.Check(_problems_ready)
@@ -0,0 +1,67 @@
+"""
+JSON codec shared by API responses and Json columns. Uses orjson or msgspec when one of them
+is installed and falls back to the stdlib json module otherwise. JOMD_JSON_CODEC picks one
+explicitly.
+"""
+from utils.constants import JSON_CODEC
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _orjson():
+    import orjson
+
+    def dumps(obj):
+        try:
+            return orjson.dumps(obj).decode()
+        except TypeError:
+            # Non str keys, ints over 64 bits, ...
+            return json.dumps(obj)
+
+    return orjson.loads, dumps
+
+
+def _msgspec():
+    import msgspec
+
+    encoder = msgspec.json.Encoder()
+    decoder = msgspec.json.Decoder()
+
+    def dumps(obj):
+        try:
+            return encoder.encode(obj).decode()
+        except (TypeError, OverflowError):
+            return json.dumps(obj)
+
+    return decoder.decode, dumps
+
+
+def _json():
+    return json.loads, json.dumps
+
+
+CODECS = {
+    "orjson": _orjson,
+    "msgspec": _msgspec,
+    "json": _json,
+}
+
+
+def _load(name):
+    names = list(CODECS) if name == "auto" else [name]
+    for name in names:
+        if name not in CODECS:
+            logger.warning("Unknown JSON codec %s, expected auto or one of %s", name, ", ".join(CODECS))
+            continue
+        try:
+            return (name, *CODECS[name]())
+        except ImportError:
+            logger.info("JSON codec %s is not installed", name)
+    logger.warning("Falling back to the stdlib json codec")
+    return ("json", *_json())
+
+
+# loads accepts str or bytes, dumps always returns str
+NAME, loads, dumps = _load(JSON_CODEC)
@@ -1,10 +1,12 @@
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, literal, cast
+from sqlalchemy.engine.url import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy import (
     Column,
     String,
     Integer,
+    BigInteger,
     Date,
     TypeDecorator,
     Float,
@@ -13,9 +15,14 @@ from sqlalchemy import (
     JSON,
     Table,
     ForeignKey,
+    Index,
     Text,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
+from sqlalchemy.pool import SingletonThreadPool
+from sqlalchemy.sql.functions import FunctionElement
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.dialects.postgresql import JSONB
 
 # Will cause a cycle but don't worry as it is not used
 # only to specify types
@@ -25,32 +32,123 @@ from sqlalchemy.orm import relationship
 #                            User as User_API, Submission as Submission_API,
 #                            Organization as Organization_API,
 #                            Language as Language_API, Judge as Judge_API)
-from utils.constants import DEBUG_DB
-import json
-
-URI = "sqlite:///utils/db/JOMD1.db"
-
-engine = create_engine(URI, echo=DEBUG_DB)
+from utils.constants import DEBUG_DB, SQLITE_PROFILE, DB_URI
+from utils import codec
+
+URI = DB_URI
+
+# Pragmas run on every new sqlite connection, picked with JOMD_SQLITE_PROFILE
+# "fast" trades durability of the last few commits on power loss for much cheaper commits,
+# WAL also lets commands read while a background job is writing
+SQLITE_PROFILES = {
+    "default": {},
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64 * 1024,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+}
+
+
+def apply_sqlite_profile(engine, profile):
+    pragmas = SQLITE_PROFILES[profile]
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in pragmas.items():
+            cursor.execute(f"PRAGMA {pragma} = {value}")
+        cursor.close()
+
+
+if make_url(URI).get_backend_name() == "sqlite":
+    # One connection per thread kept open, instead of sqlite's default of reconnecting (and rerunning
+    # the pragmas) for every session transaction
+    engine = create_engine(URI, echo=DEBUG_DB, poolclass=SingletonThreadPool)
+else:
+    engine = create_engine(
+        URI, echo=DEBUG_DB, pool_pre_ping=True, json_serializer=codec.dumps, json_deserializer=codec.loads
+    )
+apply_sqlite_profile(engine, SQLITE_PROFILE)
 Base = declarative_base(bind=engine)
 Session = sessionmaker(bind=engine, autoflush=False)
 session = Session()
 # TODO: Remove all private attributes and learn how to use joins better
 
 
+def _sync(collection, items):
+    """Mutate a relationship collection to match items, so only changed association rows are written"""
+    current = set(collection)
+    wanted = set(items)
+    for item in current - wanted:
+        collection.remove(item)
+    for item in items:
+        if item not in current:
+            collection.append(item)
+
+
 class Json(TypeDecorator):
+    """JSON stored as text, or as JSONB on postgres where the driver does the encoding"""
+
     impl = Text
 
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(JSONB())
+        return dialect.type_descriptor(Text())
+
     def process_bind_param(self, value, dialect):
-        if value is not None:
-            value = json.dumps(value)
+        if value is not None and dialect.name != "postgresql":
+            value = codec.dumps(value)
         return value
 
     def process_result_value(self, value, dialect):
-        if value is not None:
-            value = json.loads(value)
+        if value is not None and dialect.name != "postgresql":
+            value = codec.loads(value)
         return value
 
 
+class json_contains(FunctionElement):
+    """
+    True when the JSON array in column has value as an element, or with key, has an object
+    whose key is value. Use instead of .contains on Json columns, which is a LIKE on sqlite and
+    doesn't work on JSONB
+        json_contains(Problem.types, "Graph Theory")
+        json_contains(Contest.rankings, "username", key="user")
+    """
+
+    type = Boolean()
+    name = "json_contains"
+
+    def __init__(self, column, value, key=None):
+        self.key = key
+        self.value = value
+        super().__init__(column, literal(value))
+
+
+@compiles(json_contains)
+def _json_contains(element, compiler, **kw):
+    column, value = element.clauses.clauses
+    item = "item.value" if element.key is None else f"json_extract(item.value, '$.{element.key}')"
+    return "EXISTS (SELECT 1 FROM json_each(%s) AS item WHERE %s = %s)" % (
+        compiler.process(column, **kw),
+        item,
+        compiler.process(value, **kw),
+    )
+
+
+@compiles(json_contains, "postgresql")
+def _json_contains_postgresql(element, compiler, **kw):
+    column = element.clauses.clauses[0]
+    contained = [element.value] if element.key is None else [{element.key: element.value}]
+    return "%s @> %s" % (compiler.process(column, **kw), compiler.process(cast(codec.dumps(contained), JSONB), **kw))
+
+
 contest_problem = Table(
     "contest_problem",
     Base.metadata,
@@ -107,13 +205,6 @@ participation_user = Table(
     Column("user_id", Integer, ForeignKey("user.id")),
 )
 
-language_submission = Table(
-    "language_submission",
-    Base.metadata,
-    Column("language_id", Integer, ForeignKey("language.id")),
-    Column("submission_id", Integer, ForeignKey("submission.id")),
-)
-
 organization_user = Table(
     "organization_user",
     Base.metadata,
@@ -128,20 +219,6 @@ judge_language = Table(
     Column("language_id", Integer, ForeignKey("language.id")),
 )
 
-submission_user = Table(
-    "submission_user",
-    Base.metadata,
-    Column("submission_id", Integer, ForeignKey("submission.id")),
-    Column("user_id", Integer, ForeignKey("user.id")),
-)
-
-problem_submission = Table(
-    "problem_submission",
-    Base.metadata,
-    Column("submission_id", Integer, ForeignKey("submission.id")),
-    Column("problem_id", String, ForeignKey("problem.code")),
-)
-
 
 class Problem(Base):
     __tablename__ = "problem"
@@ -166,10 +243,13 @@ class Problem(Base):
 
     contests = relationship("Contest", secondary=contest_problem, back_populates="problems")
     solved_users = relationship("User", secondary=problem_user, back_populates="solved_problems")
-    submissions = relationship("Submission", secondary=problem_submission, back_populates="problem")
+    submissions = relationship("Submission", back_populates="problem")
 
     def __init__(self, problem):
         self.code = problem.code
+        self.update(problem)
+
+    def update(self, problem):
         self.name = problem.name
         # Authors is stored as array on usernames
         # Perhaps I can figure out a way to store an array of user objects
@@ -187,9 +267,9 @@ class Problem(Base):
         self.points = problem.points
         self.partial = problem.partial
         self.short_circuit = problem.short_circuit
-        self.languages += problem.languages
+        _sync(self.languages, problem.languages)
         self.is_organization_private = problem.is_organization_private
-        self.organizations += problem.organizations
+        _sync(self.organizations, problem.organizations)
         self.is_public = problem.is_public
 
 
@@ -211,8 +291,9 @@ class Contest(Base):
     organizations = relationship("Organization", secondary=contest_organization, back_populates="contest")
     is_private = Column(Boolean)
     tags = Column(Json)
-    _format = Column("format", Json)
-    rankings = Column(Json)
+    # Only loaded on access, use .options(undefer(Contest.rankings)) when iterating many contests
+    _format = deferred(Column("format", Json))
+    rankings = deferred(Column(Json))
     problems = relationship("Problem", secondary=contest_problem, back_populates="contests")
 
     participations = relationship("Participation", secondary=contest_participation, back_populates="contest")
@@ -220,6 +301,9 @@ class Contest(Base):
 
     def __init__(self, contest):
         self.key = contest.key
+        self.update(contest)
+
+    def update(self, contest):
         self.name = contest.name
         self.start_time = contest.start_time
         self.end_time = contest.end_time
@@ -231,12 +315,12 @@ class Contest(Base):
         self.rating_ceiling = contest.rating_ceiling
         self.hidden_scoreboard = contest.hidden_scoreboard
         self.is_organization_private = contest.is_organization_private
-        self.organizations += contest.organizations
+        _sync(self.organizations, contest.organizations)
         self.is_private = contest.is_private
         self.tags = contest.tags
         self._format = contest.format
         self.rankings = contest.rankings
-        self.problems += contest.problems
+        _sync(self.problems, contest.problems)
 
 
 class Participation(Base):
@@ -274,6 +358,8 @@ class User(Base):
     rank = Column(String)
     rating = Column(Integer)
     max_rating = Column(Integer)
+    # Set when the detailed /user/ object was last stored
+    fetched_at = Column(DateTime)
     solved_problems = relationship("Problem", secondary=problem_user, back_populates="solved_users")
     organizations = relationship("Organization", secondary=organization_user, back_populates="users")
     contests = relationship("Contest", secondary=contest_user, back_populates="users")
@@ -281,19 +367,22 @@ class User(Base):
     # authored = relationship('Problem', secondary=problem_author_user,
     #                         back_populates='authors')
     participation = relationship("Participation", secondary=participation_user, back_populates="user")
-    submissions = relationship("Submission", secondary=submission_user, back_populates="user")
+    submissions = relationship("Submission", back_populates="user")
 
     def __init__(self, user):
         self.id = user.id
+        self.update(user)
+
+    def update(self, user):
         self.username = user.username
         self.points = user.points
         self.performance_points = user.performance_points
         self.problem_count = user.problem_count
         self.rank = user.rank
         self.rating = user.rating
-        self.solved_problems += user.solved_problems
-        self.organizations += user.organizations
-        self.contests += user.contests
+        _sync(self.solved_problems, user.solved_problems)
+        _sync(self.organizations, user.organizations)
+        _sync(self.contests, user.contests)
         self.max_rating = user.max_rating
 
 
@@ -301,11 +390,13 @@ class Submission(Base):
     __tablename__ = "submission"
 
     id = Column(Integer, primary_key=True)
-    # TODO: Should only be a single foreign key
-    problem = relationship("Problem", secondary=problem_submission, back_populates="submissions")
-    user = relationship("User", secondary=submission_user, back_populates="submissions")
+    problem_id = Column(String, ForeignKey("problem.code"), index=True)
+    problem = relationship("Problem", back_populates="submissions")
+    user_id = Column(Integer, ForeignKey("user.id"), index=True)
+    user = relationship("User", back_populates="submissions")
     date = Column(DateTime)
-    language = relationship("Language", secondary=language_submission, back_populates="submissions")
+    language_id = Column(Integer, ForeignKey("language.id"), index=True)
+    language = relationship("Language", back_populates="submissions")
     time = Column(Float)
     memory = Column(Float)
     points = Column(Float)
@@ -320,12 +411,12 @@ class Submission(Base):
 
     def __init__(self, submission):
         self.id = submission.id
-        self.problem += submission.problem
+        self.problem = submission.problem
         self._code = submission._problem
         self._user = submission._user
-        self.user += submission.user
+        self.user = submission.user
         self.date = submission.date
-        self.language += submission.language
+        self.language = submission.language
         self.time = submission.time
         self.memory = submission.memory
         self.points = submission.points
@@ -369,7 +460,7 @@ class Language(Base):
     code_template = Column(String)
 
     problems = relationship("Problem", secondary=language_problem, back_populates="languages")
-    submissions = relationship("Submission", secondary=language_submission, back_populates="language")
+    submissions = relationship("Submission", back_populates="language")
     judges = relationship("Judge", secondary=judge_language, back_populates="languages")
 
     def __init__(self, language):
@@ -405,17 +496,20 @@ class Judge(Base):
 class Handle(Base):
     __tablename__ = "handle"
     _id = Column(Integer, primary_key=True, autoincrement=True)
-    id = Column(Integer, index=True)
+    # Discord snowflakes don't fit in a 32 bit INTEGER outside of sqlite
+    id = Column(BigInteger, index=True)
     handle = Column(String, index=True)
     user_id = Column(Integer)
-    guild_id = Column(Integer, index=True)
+    guild_id = Column(BigInteger, index=True)
 
 
 class Gitgud(Base):
     __tablename__ = "gitgud"
+    # Every gitgud command looks up one handle in one guild, +gitlog newest first
+    __table_args__ = (Index("ix_gitgud_handle_guild_id_time", "handle", "guild_id", "time"),)
     _id = Column(Integer, primary_key=True, autoincrement=True)
     handle = Column(String)
-    guild_id = Column(Integer)
+    guild_id = Column(BigInteger)
     point = Column(Integer)
     # TODO: make it a foreign key problem table
     problem_id = Column(String)
@@ -424,13 +518,24 @@ class Gitgud(Base):
 
 class CurrentGitgud(Base):
     __tablename__ = "current_gitgud"
+    __table_args__ = (Index("ix_current_gitgud_handle_guild_id", "handle", "guild_id"),)
     _id = Column(Integer, primary_key=True)
     handle = Column(String)
-    guild_id = Column(Integer)
+    guild_id = Column(BigInteger)
     # TODO: make it a foreign key problem table
     problem_id = Column(String)
     point = Column(Integer)
     time = Column(DateTime)
 
 
+class GitgudScore(Base):
+    """Total gitgud points of a handle in a guild, added to by utils.gitgud.Gitgud.insert"""
+
+    __tablename__ = "gitgud_score"
+    __table_args__ = (Index("ix_gitgud_score_guild_id_point", "guild_id", "point"),)
+    handle = Column(String, primary_key=True)
+    guild_id = Column(BigInteger, primary_key=True)
+    point = Column(Integer, nullable=False, default=0)
+
+
 # Base.metadata.create_all(engine)
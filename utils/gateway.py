@@ -0,0 +1,42 @@
+import typing as t
+import hikari
+from hikari.api import CacheComponents
+from hikari.impl import CacheSettings
+from utils.constants import GATEWAY_PROFILE, MESSAGE_CACHE_SIZE
+
+# Commands only read guilds, channels, roles and members from the cache, prefix commands need
+# message content and paginators use interactions which don't need an intent
+MINIMAL_INTENTS = (
+    hikari.Intents.GUILDS |
+    hikari.Intents.GUILD_MEMBERS |
+    hikari.Intents.GUILD_MESSAGES |
+    hikari.Intents.MESSAGE_CONTENT
+)
+MINIMAL_CACHE = (
+    CacheComponents.GUILDS |
+    CacheComponents.GUILD_CHANNELS |
+    CacheComponents.ROLES |
+    CacheComponents.MEMBERS |
+    CacheComponents.ME
+)
+
+
+def gateway_profile(profile: str = GATEWAY_PROFILE):
+    """Intents and cache settings for a JOMD_GATEWAY_PROFILE, "minimal" or "all" (hikari's defaults)"""
+    if profile == "all":
+        return hikari.Intents.ALL, CacheSettings()
+    if profile == "minimal":
+        components = MINIMAL_CACHE
+        if MESSAGE_CACHE_SIZE > 0:
+            components |= CacheComponents.MESSAGES
+        cache_settings = CacheSettings(components=components, max_messages=MESSAGE_CACHE_SIZE, max_dm_channel_ids=0)
+        return MINIMAL_INTENTS, cache_settings
+    raise ValueError(f"Unknown gateway profile {profile}")
+
+
+def owns_guilds(app: hikari.GatewayBot, guild_ids: t.Iterable[int]) -> bool:
+    """
+    Whether this process does the background work for something spread over guild_ids. The process
+    running the lowest of their shards does it, so it happens once across all shard processes
+    """
+    return min(hikari.snowflakes.calculate_shard_id(app, guild_id) for guild_id in guild_ids) in app.shards
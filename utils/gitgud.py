@@ -1,5 +1,12 @@
 from sqlalchemy import func, desc
 from sqlalchemy.orm import joinedload
+from utils.leaderboard import gitgud_rankings
+from utils.solved import solved_cache
+from utils.query import Query
+from utils.constants import RATING_TO_POINT, POINT_VALUES
+from datetime import datetime
+import asyncio
+import logging
 from utils.db import (
     session,
     Problem as Problem_DB,
@@ -13,25 +20,27 @@ from utils.db import (
     Handle as Handle_DB,
     Gitgud as Gitgud_DB,
     CurrentGitgud as CurrentGitgud_DB,
+    GitgudScore as GitgudScore_DB,
     Json,
 )
 
+logger = logging.getLogger(__name__)
+
 
 class Gitgud:
     def get_point(self, handle, guild_id):
-        q = (
-            session.query(func.sum(Gitgud_DB.point))
-            .filter(Gitgud_DB.handle == handle)
-            .filter(Gitgud_DB.guild_id == guild_id)
-        )
-        return q.first()[0]
+        score = session.query(GitgudScore_DB).get((handle, guild_id))
+        return score and score.point
 
-    def get_all(self, handle, guild_id):
+    def get_all(self, handle, guild_id, limit=None):
+        """History newest first as (Gitgud_DB, Problem_DB) pairs, the problem is None if it isn't cached"""
         q = (
-            session.query(Gitgud_DB)
+            session.query(Gitgud_DB, Problem_DB)
+            .outerjoin(Problem_DB, Problem_DB.code == Gitgud_DB.problem_id)
             .filter(Gitgud_DB.handle == handle)
             .filter(Gitgud_DB.guild_id == guild_id)
             .order_by(desc(Gitgud_DB.time))
+            .limit(limit)
         )
         return q.all()
 
@@ -43,7 +52,16 @@ class Gitgud:
         db.problem_id = problem
         db.time = time
         session.add(db)
+        score = session.query(GitgudScore_DB).get((handle, guild_id))
+        if score is None:
+            score = GitgudScore_DB()
+            score.handle = handle
+            score.guild_id = guild_id
+            score.point = 0
+            session.add(score)
+        score.point += point
         session.commit()
+        gitgud_rankings.update(guild_id, handle, score.point)
 
     def get_current(self, handle, guild_id):
         result = (
@@ -54,16 +72,59 @@ class Gitgud:
         return result.first()
 
     def has_solved(self, username, problem_code):
-        q = (
-            session.query(User_DB)
-            .filter(User_DB.username == username)
-            .join(User_DB.solved_problems)
-            .filter(Problem_DB.code == problem_code)
-            .options(joinedload(User_DB.solved_problems))
+        return solved_cache.has_solved(username, problem_code)
+
+    def get_challenge_point(self, problem_point, rating):
+        # get closest rating
+        closest = -1000
+        for key in RATING_TO_POINT:
+            if abs(key - rating) <= abs(closest - rating):
+                closest = key
+        # convert rating to point and get difference
+        rating_point = RATING_TO_POINT[closest]
+        point_diff = POINT_VALUES.index(problem_point) - POINT_VALUES.index(rating_point)
+        return max(10 + 2 * point_diff, 0)
+
+    def complete(self, current, rating, time):
+        """Credit the current challenge and clear it, returns the points gained"""
+        point = self.get_challenge_point(current.point, rating)
+        self.insert(current.handle, current.guild_id, point, current.problem_id, time)
+        self.clear(current.handle, current.guild_id)
+        return point
+
+    async def check_current(self, owns=None):
+        """
+        Credit every current challenge that has been solved, returns the completed (handle, guild_id, points).
+        Each handle's new ACs are fetched once, however many guilds it has challenges in. With owns, only
+        the handles where owns(guild ids of the handle's challenges) is true
+        """
+        currents = session.query(CurrentGitgud_DB).filter(CurrentGitgud_DB.problem_id.isnot(None)).all()
+        if owns is not None:
+            guilds = {}
+            for current in currents:
+                guilds.setdefault(current.handle, []).append(current.guild_id)
+            currents = [current for current in currents if owns(guilds[current.handle])]
+        handles = list({current.handle for current in currents})
+        query = Query()
+        results = await asyncio.gather(
+            *[query.get_new_submissions(handle, result="AC") for handle in handles], return_exceptions=True
         )
-        if q.count():
-            return True
-        return False
+        for handle, result in zip(handles, results):
+            if isinstance(result, Exception):
+                logger.warning("Checking %s failed: %r", handle, result)
+
+        completed = []
+        for current in currents:
+            # +gotgud or +nogud might have got to it while fetching
+            if current.problem_id is None or not self.has_solved(current.handle, current.problem_id):
+                continue
+            user = session.query(User_DB).filter(User_DB.username == current.handle).first()
+            if user is None or user.rating is None:
+                continue
+            point = self.complete(current, user.rating, datetime.now())
+            completed.append((current.handle, current.guild_id, point))
+            logger.info("%s completed their gitgud in %s for %s points", current.handle, current.guild_id, point)
+        return completed
 
     # set the user's current gitgud
     def bind(self, handle, guild_id, problem_id, point, time):
@@ -6,6 +6,9 @@ import hikari
 from lightbulb.converters import base
 import typing as t
 import re
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 def list_to_str(arg):
@@ -76,11 +79,11 @@ async def gimme_common(username, points, types):
     if len(unsolved) == 0:
         return None, None
 
-    problem = random.choice(unsolved)
+    code = random.choice(unsolved)
 
     # Sometimes the problem might not contain the memory info
     # so we need to call the api
-    problem = await query.get_problem(problem.code)
+    problem = await query.get_problem(code)
 
     points = str(problem.points)
     if problem.partial:
@@ -108,3 +111,15 @@ async def gimme_common(username, points, types):
     embed.add_field(name="Memory", value=memory, inline=True)
 
     return embed, problem
+
+
+async def run_periodically(interval, func, *args):
+    """Await func(*args) every interval seconds until cancelled, logging failures"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await func(*args)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Periodic task %s failed", func.__name__)
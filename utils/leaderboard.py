@@ -0,0 +1,157 @@
+import bisect
+import time
+import typing as t
+from utils.constants import CACHE_TTL
+from utils.db import session, User as User_DB, Handle as Handle_DB, GitgudScore as GitgudScore_DB
+
+UNRATED = -9999
+
+
+class Ranking:
+    """
+    Members kept in a sorted array of (key, member), lower keys rank higher.
+    Rank lookups are a binary search, updates a single insort.
+    """
+
+    def __init__(self):
+        self._entries: t.List[t.Tuple[t.Any, str]] = []
+        self._keys: t.Dict[str, t.Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __contains__(self, member: str) -> bool:
+        return member in self._keys
+
+    def update(self, member: str, key) -> None:
+        if member in self._keys and self._keys[member] == key:
+            return
+        self.remove(member)
+        self._keys[member] = key
+        bisect.insort(self._entries, (key, member))
+
+    def remove(self, member: str) -> None:
+        if member not in self._keys:
+            return
+        idx = bisect.bisect_left(self._entries, (self._keys.pop(member), member))
+        del self._entries[idx]
+
+    def rank(self, member: str) -> t.Optional[int]:
+        """1-indexed rank of member"""
+        if member not in self._keys:
+            return None
+        return bisect.bisect_left(self._entries, (self._keys[member], member)) + 1
+
+    def page(self, start: int, count: int) -> t.List[t.Tuple[t.Any, str]]:
+        return self._entries[start:start + count]
+
+
+# Negated so the highest value sorts first, ties are broken by username
+METRICS = {
+    "rating": lambda user: -(user.rating or UNRATED),
+    "maxrating": lambda user: -(user.max_rating or UNRATED),
+    "points": lambda user: -(user.performance_points or 0),
+    "solved": lambda user: -(user.problem_count or 0),
+}
+
+
+class Leaderboards:
+    """
+    Per guild rankings of linked users for each of METRICS, built from the db on
+    first use and updated in place whenever a user row is refreshed. Rebuilt after
+    CACHE_TTL to pick up users refreshed by other shard processes
+    """
+
+    def __init__(self):
+        self._guilds: t.Dict[int, t.Dict[str, Ranking]] = {}
+        self._built: t.Dict[int, float] = {}
+        # username -> guild ids it is linked in, only for built guilds
+        self._linked: t.Dict[str, t.Set[int]] = {}
+
+    def build(self, guild_id: int, users) -> None:
+        self.clear(guild_id)
+        self._guilds[guild_id] = {metric: Ranking() for metric in METRICS}
+        self._built[guild_id] = time.monotonic()
+        for user in users:
+            self.add(guild_id, user)
+
+    def clear(self, guild_id: int) -> None:
+        self._built.pop(guild_id, None)
+        if self._guilds.pop(guild_id, None) is None:
+            return
+        for guild_ids in self._linked.values():
+            guild_ids.discard(guild_id)
+
+    def get(self, guild_id: int, metric: str) -> Ranking:
+        if guild_id not in self._guilds or (CACHE_TTL and time.monotonic() - self._built[guild_id] > CACHE_TTL):
+            users = (
+                session.query(User_DB)
+                .join(Handle_DB, Handle_DB.handle == User_DB.username)
+                .filter(Handle_DB.guild_id == guild_id)
+            )
+            self.build(guild_id, users)
+        return self._guilds[guild_id][metric]
+
+    def add(self, guild_id: int, user) -> None:
+        if guild_id not in self._guilds:
+            # Will be read from the db on first use
+            return
+        self._linked.setdefault(user.username, set()).add(guild_id)
+        for metric, key in METRICS.items():
+            self._guilds[guild_id][metric].update(user.username, key(user))
+
+    def remove(self, guild_id: int, username: str) -> None:
+        if guild_id not in self._guilds:
+            return
+        self._linked.get(username, set()).discard(guild_id)
+        for ranking in self._guilds[guild_id].values():
+            ranking.remove(username)
+
+    def update_user(self, user) -> None:
+        for guild_id in self._linked.get(user.username, ()):
+            for metric, key in METRICS.items():
+                self._guilds[guild_id][metric].update(user.username, key(user))
+
+
+class GitgudRankings:
+    """
+    Per guild ranking of total gitgud points, built from gitgud_score on first use and
+    updated by utils.gitgud.Gitgud.insert as points are gained. Rebuilt after CACHE_TTL
+    like Leaderboards
+    """
+
+    def __init__(self):
+        self._guilds: t.Dict[int, Ranking] = {}
+        self._built: t.Dict[int, float] = {}
+
+    def build(self, guild_id: int, scores: t.Iterable[t.Tuple[str, int]]) -> None:
+        ranking = Ranking()
+        for handle, point in scores:
+            ranking.update(handle, -point)
+        self._guilds[guild_id] = ranking
+        self._built[guild_id] = time.monotonic()
+
+    def clear(self, guild_id: int) -> None:
+        self._guilds.pop(guild_id, None)
+        self._built.pop(guild_id, None)
+
+    def get(self, guild_id: int) -> Ranking:
+        if guild_id not in self._guilds or (CACHE_TTL and time.monotonic() - self._built[guild_id] > CACHE_TTL):
+            scores = session.query(GitgudScore_DB.handle, GitgudScore_DB.point).filter(
+                GitgudScore_DB.guild_id == guild_id
+            )
+            self.build(guild_id, scores)
+        return self._guilds[guild_id]
+
+    def update(self, guild_id: int, handle: str, point: int) -> None:
+        if guild_id not in self._guilds:
+            # Will be read from the db on first use
+            return
+        self._guilds[guild_id].update(handle, -point)
+
+
+leaderboards = Leaderboards()
+gitgud_rankings = GitgudRankings()
@@ -1,5 +1,5 @@
 from lightbulb.converters.special import MemberConverter
-from utils.api import API
+from utils.api import API, ObjectNotFound, iter_pages
 from sqlalchemy import or_, func
 from utils.db import (
     session,
@@ -13,8 +13,14 @@ from utils.db import (
     Judge as Judge_DB,
     Handle as Handle_DB,
     Json,
+    json_contains,
 )
-from typing import List
+from utils.leaderboard import leaderboards
+from utils.search import problem_index
+from utils.solved import solved_cache
+from utils.constants import USER_CACHE_TTL, API_PAGE_SIZE
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Iterable, List, Tuple
 from sqlalchemy.sql import functions
 import asyncio
 from operator import attrgetter, itemgetter
@@ -34,9 +40,9 @@ class Query:
             try:
                 if isinstance(key.property.columns[0].type, Json):
                     if isinstance(val, str):
-                        cond = key.contains(val)
+                        cond = json_contains(key, val)
                     elif isinstance(val, list):
-                        cond = or_(key.contains(v) for v in val)
+                        cond = or_(json_contains(key, v) for v in val)
                     elif isinstance(val, functions.Function):
                         cond = key == val
                     elif isinstance(val, bool):
@@ -82,8 +88,9 @@ class Query:
         organization: str = None,
         search: str = None,
         cached: bool = False,
+        progress: Callable[[int, int], Awaitable[None]] = None,
     ) -> List[Problem_DB]:
-
+        """progress is awaited with (pages stored, total pages) as each page of a full fetch is stored"""
         q = (
             session.query(Problem_DB)
             .filter(self.parse(Problem_DB.partial, partial))
@@ -91,40 +98,49 @@ class Query:
             .filter(self.parse(Problem_DB.types, _type))
             .filter(self.parse(Problem_DB.organizations, organization))
         )
+        if search is not None:
+            codes = problem_index.search(search)
+            if codes:
+                problems = {problem.code: problem for problem in q.filter(Problem_DB.code.in_(codes))}
+                return [problems[code] for code in codes if code in problems]
+            if cached:
+                return []
+
         if cached:
             return q.all()
 
         a = API()
         if search is not None:
-            # Can't bother to implement something with db
-            # maybe future me can do this
+            # Nothing cached matches, might be a problem newer than the last +update_problems
             await a.get_problems(partial=partial, group=group, _type=_type, organization=organization, search=search)
             return list(map(Problem_DB, a.data.objects))
 
-        page = 1
-        await a.get_problems(
-            partial=partial, group=group, _type=_type, organization=organization, search=search, page=page
-        )
+        params = {"partial": partial, "group": group, "_type": _type, "organization": organization}
+        await a.get_problems(**params, page=1)
 
         if a.data.total_objects == q.count():
             return q.all()
 
-        for problem in a.data.objects:
-            qq = session.query(Problem_DB).filter(Problem_DB.code == problem.code)
-            if qq.count() == 0:
-                session.add(Problem_DB(problem))
-
-        while a.data.has_more:
-            page += 1
-            await a.get_problems(
-                partial=partial, group=group, _type=_type, organization=organization, search=search, page=page
-            )
-
-            for problem in a.data.objects:
-                qq = session.query(Problem_DB).filter(Problem_DB.code == problem.code)
-                if qq.count() == 0:
+        def store(api):
+            codes = list(map(attrgetter("code"), api.data.objects))
+            qq = session.query(Problem_DB.code).filter(Problem_DB.code.in_(codes)).all()
+            qq = set(map(itemgetter(0), qq))
+            for problem in api.data.objects:
+                if problem.code not in qq:
                     session.add(Problem_DB(problem))
-        session.commit()
+            session.commit()
+
+        store(a)
+        total_pages = a.data.total_pages
+        stored = 1
+        if progress is not None:
+            await progress(stored, total_pages)
+
+        async for api in iter_pages(API.get_problems, range(2, total_pages + 1), **params):
+            store(api)
+            stored += 1
+            if progress is not None:
+                await progress(stored, total_pages)
         return q.all()
 
     async def get_problem(self, code: str, cached: bool = True) -> Problem_DB:
@@ -136,12 +152,15 @@ class Query:
 
         a = API()
         await a.get_problem(code)
-        q = session.query(Problem_DB).filter(Problem_DB.code == a.data.object.code)
-        if q.count():
-            q.delete()
-        session.add(Problem_DB(a.data.object))
+        problem = session.query(Problem_DB).filter(Problem_DB.code == a.data.object.code).first()
+        if problem is None:
+            problem = Problem_DB(a.data.object)
+            session.add(problem)
+        else:
+            # Only write what changed instead of deleting and reinserting every association row
+            problem.update(a.data.object)
         session.commit()
-        return q.first()
+        return problem
 
     async def get_judges(self) -> List[Judge_DB]:
         # If this ever has more than 1 page, I'll eat a rock
@@ -189,12 +208,14 @@ class Query:
         a = API()
         await a.get_contest(key)
         # Requery the key to prevent path traversal from killing db
-        q = session.query(Contest_DB).filter(Contest_DB.key == a.data.object.key)
-        if q.count():
-            q.delete()
-        session.add(Contest_DB(a.data.object))
+        contest = session.query(Contest_DB).filter(Contest_DB.key == a.data.object.key).first()
+        if contest is None:
+            contest = Contest_DB(a.data.object)
+            session.add(contest)
+        else:
+            contest.update(a.data.object)
         session.commit()
-        return q.first()
+        return contest
 
     async def get_users(self, organization: str = None) -> List[User_DB]:
         a = API()
@@ -223,23 +244,86 @@ class Query:
         session.commit()
         return q.all()
 
-    async def get_user(self, username: str) -> User_DB:
+    async def get_user(self, username: str, stale: bool = False, force: bool = False) -> User_DB:
+        """
+        Users are refetched once they are older than USER_CACHE_TTL.
+        stale serves any detailed cached row regardless of age, for commands that only need the
+        canonical username, force always refetches.
+        """
         q = session.query(User_DB).filter(func.lower(User_DB.username) == func.lower(username))
-        # if q.count():
-        #     # solved_problems checks if it has detailed rows
-        #     if len(q.first().solved_problems) != 0:
-        #         return q.first()
+        user = q.first()
+        # fetched_at is only set on detailed rows
+        if user is not None and user.fetched_at is not None and not force:
+            if stale or datetime.utcnow() - user.fetched_at < timedelta(seconds=USER_CACHE_TTL):
+                return user
 
         a = API()
         await a.get_user(username)
-        q = session.query(User_DB).filter(func.lower(User_DB.username) == func.lower(a.data.object.username))
-        if q.count():
-            # Needs to be fetch, the default (evaluate) is not able to eval
-            # the query
-            q.delete(synchronize_session="fetch")
-        session.add(User_DB(a.data.object))
+        user = session.query(User_DB).filter(User_DB.id == a.data.object.id).first()
+        if user is None:
+            user = User_DB(a.data.object)
+            session.add(user)
+        else:
+            user.update(a.data.object)
+        user.fetched_at = datetime.utcnow()
+        session.commit()
+        leaderboards.update_user(user)
+        solved_cache.update_user(user)
+        return user
+
+    async def refresh_users(self, usernames: List[str]) -> Tuple[int, int]:
+        """
+        Refresh the summary columns of cached users from the paginated /users endpoint,
+        one request per page instead of one per user.
+        Returns the number of users found and the number of rows that changed.
+        """
+        users = (
+            session.query(User_DB)
+            .filter(func.lower(User_DB.username).in_([username.lower() for username in usernames]))
+            .all()
+        )
+        remaining = {user.username.lower(): user for user in users}
+        # /users is ordered by id, nothing wanted is past the page holding the highest id
+        last_id = max((user.id for user in users), default=0)
+        found, changed = 0, 0
+
+        page = 1
+        while remaining:
+            a = API()
+            await a.get_users(page=page)
+            for user in a.data.objects:
+                row = remaining.pop(user.username.lower(), None)
+                if row is None:
+                    continue
+                found += 1
+                max_rating = max(row.max_rating or 0, user.rating or 0) or row.max_rating
+                new = (user.points, user.performance_points, user.problem_count, user.rank, user.rating, max_rating)
+                old = (row.points, row.performance_points, row.problem_count, row.rank, row.rating, row.max_rating)
+                if new != old:
+                    changed += 1
+                    (row.points, row.performance_points, row.problem_count, row.rank, row.rating, row.max_rating) = new
+                    leaderboards.update_user(row)
+            if not a.data.has_more or not a.data.objects or a.data.objects[-1].id >= last_id:
+                break
+            page += 1
         session.commit()
-        return q.first()
+        if remaining:
+            # Renamed, deleted or unlisted since they were cached
+            logger.info("%s users not on /users: %s", len(remaining), ", ".join(sorted(remaining)))
+        return found, changed
+
+    async def refresh_linked_users(self, owns: Callable[[Iterable[int]], bool] = None) -> Tuple[int, int, int]:
+        """
+        Refresh every handle linked in any guild, returns (handles, found, changed).
+        With owns, only the handles where owns(guild ids the handle is linked in) is true
+        """
+        guilds = {}
+        for handle, guild_id in session.query(Handle_DB.handle, Handle_DB.guild_id):
+            guilds.setdefault(handle, []).append(guild_id)
+        handles = [handle for handle, guild_ids in guilds.items() if owns is None or owns(guild_ids)]
+        found, changed = await self.refresh_users(handles)
+        logger.info("Refreshed %s/%s linked users, %s rows changed", found, len(handles), changed)
+        return len(handles), found, changed
 
     async def get_participations(
         self,
@@ -247,24 +331,26 @@ class Query:
         user: str = None,
         is_disqualified: bool = None,
         virtual_participation_number: int = None,
+        progress: Callable[[int, int], Awaitable[None]] = None,
     ) -> List[Participation_DB]:
+        """progress is awaited with (pages stored, total pages) as each page is stored"""
+        params = {
+            "contest": contest,
+            "user": user,
+            "is_disqualified": is_disqualified,
+            "virtual_participation_number": virtual_participation_number,
+        }
         a = API()
 
         page = 1
-        await a.get_participations(
-            contest=contest,
-            user=user,
-            is_disqualified=is_disqualified,
-            virtual_participation_number=virtual_participation_number,
-            page=page,
-        )
+        await a.get_participations(**params, page=page)
 
         # why the hell are these names so long?
         cond_contest = self.parse(Contest_DB.key, contest)
         if not cond_contest:
             cond_contest = Participation_DB.contest.any(cond_contest)
 
-        cond_user = self.parse(func.lower(User_DB.username), func.lower(user))
+        cond_user = self.parse(func.lower(User_DB.username), user and func.lower(user))
         if not cond_user:
             cond_user = Participation_DB.user.any(cond_user)
 
@@ -279,45 +365,26 @@ class Query:
         if a.data.total_objects == q.count():
             return q.all()
 
-        participation_id = list(map(attrgetter("id"), a.data.objects))
-        qq = session.query(Submission_DB.id).filter(Submission_DB.id.in_(participation_id)).all()
-        qq = list(map(itemgetter(0), qq))
-        for submission in a.data.objects:
-            if submission.id not in qq:
-                session.add(Submission_DB(submission))
-        total_pages = a.data.total_pages
-        for participation in a.data.objects:
-            if participation.id not in participation_id:
-                session.add(Participation_DB(participation))
-
-        apis = []
-        to_gather = []
-
-        for _ in range(2, total_pages + 1):
-            page += 1
-            api = API()
-            to_await = await a.get_participations(
-                contest=contest,
-                user=user,
-                is_disqualified=is_disqualified,
-                virtual_participation_number=virtual_participation_number,
-                page=page,
-            )
-            apis.append(api)
-            to_gather.append(to_await)
-        await asyncio.gather(*to_gather)
-        for api in apis:
-            participation_id = list(map(attrgetter("id"), api.data.objects))
-            qq = session.query(Submission_DB.id).filter(Submission_DB.id.in_(participation_id)).all()
+        def store(api):
+            participation_ids = list(map(attrgetter("id"), api.data.objects))
+            qq = session.query(Participation_DB.id).filter(Participation_DB.id.in_(participation_ids)).all()
             qq = list(map(itemgetter(0), qq))
-            for submission in api.data.objects:
-                if submission.id not in qq:
-                    session.add(Submission_DB(submission))
-            total_pages = api.data.total_pages
             for participation in api.data.objects:
-                if participation.id not in participation_id:
+                if participation.id not in qq:
                     session.add(Participation_DB(participation))
-        session.commit()
+            session.commit()
+
+        store(a)
+        total_pages = a.data.total_pages
+        stored = 1
+        if progress is not None:
+            await progress(stored, total_pages)
+
+        async for api in iter_pages(API.get_participations, range(2, total_pages + 1), **params):
+            store(api)
+            stored += 1
+            if progress is not None:
+                await progress(stored, total_pages)
         return q.all()
 
     async def get_submissions(
@@ -355,35 +422,76 @@ class Query:
         if a.data.total_objects == q.count():
             return q.all()
 
-        submission_ids = list(map(attrgetter("id"), a.data.objects))
+        self._store_submissions(a)
+        pages = iter_pages(
+            API.get_submissions,
+            range(2, a.data.total_pages + 1),
+            user=user,
+            problem=problem,
+            language=language,
+            result=result,
+        )
+        async for api in pages:
+            if api.data.objects is None:
+                continue
+            self._store_submissions(api)
+        return q.all()
+
+    def _store_submissions(self, api) -> int:
+        """Add the submissions of a fetched page that aren't stored yet, returns how many were new"""
+        submission_ids = list(map(attrgetter("id"), api.data.objects))
         qq = session.query(Submission_DB.id).filter(Submission_DB.id.in_(submission_ids)).all()
         qq = list(map(itemgetter(0), qq))
-        for submission in a.data.objects:
+        new = 0
+        for submission in api.data.objects:
             if submission.id not in qq:
                 session.add(Submission_DB(submission))
-        total_pages = a.data.total_pages
-
-        apis = []
-        to_gather = []
-
-        for _ in range(2, total_pages + 1):
-            page += 1
-            api = API()
-            to_await = api.get_submissions(user=user, problem=problem, language=language, result=result, page=page)
-            apis.append(api)
-            to_gather.append(to_await)
-        await asyncio.gather(*to_gather)
-        for api in apis:
+                new += 1
+        # Commit every page so nothing is held past the page it came from
+        session.commit()
+        solved_cache.add_submissions(api.data.objects)
+        return new
+
+    async def get_new_submissions(self, user: str, result: str = None) -> int:
+        """
+        Fetch only the user's submissions newer than the stored ones, returns how many were added.
+        DMOJ lists submissions oldest first, so this starts on the page the stored ones reach and steps
+        back while a page has nothing stored yet. Usually a single request
+        """
+        stored = (
+            session.query(func.count(Submission_DB.id))
+            .filter(Submission_DB._user == user)
+            .filter(self.parse(Submission_DB.result, result))
+            .scalar()
+        )
+        start = stored // API_PAGE_SIZE + 1
+        total_pages = start
+        added = 0
+        page = start
+        while True:
+            a = API()
+            try:
+                await a.get_submissions(user=user, result=result, page=page)
+            except ObjectNotFound:
+                # Past the last page, the stored submissions weren't all the oldest ones
+                if page == 1:
+                    raise
+                page -= 1
+                continue
+            new = self._store_submissions(a)
+            added += new
+            if page == start:
+                total_pages = a.data.total_pages
+            if page == 1 or new < len(a.data.objects):
+                break
+            page -= 1
+
+        pages = iter_pages(API.get_submissions, range(start + 1, total_pages + 1), user=user, result=result)
+        async for api in pages:
             if api.data.objects is None:
                 continue
-            submission_ids = list(map(attrgetter("id"), api.data.objects))
-            qq = session.query(Submission_DB.id).filter(Submission_DB.id.in_(submission_ids)).all()
-            qq = list(map(itemgetter(0), qq))
-            for submission in api.data.objects:
-                if submission.id not in qq:
-                    session.add(Submission_DB(submission))
-        session.commit()
-        return q.all()
+            added += self._store_submissions(api)
+        return added
 
     async def get_submission(self, id: int) -> Submission_DB:
         # Can't use this till i figure out whether or not to use api token
@@ -416,38 +524,39 @@ class Query:
         if q.count():
             return q.first()
 
-    def get_unsolved_problems(self, username: str, types: List[str], low: int = 1, high: int = 50) -> Problem_DB:
+    def get_unsolved_problems(self, username: str, types: List[str], low: int = 1, high: int = 50) -> List[str]:
+        """
+        Codes of the problems the user hasn't solved, as of the last time the user and their
+        submissions were fetched, so get_user the user first.
+        Solved ones are dropped with the in-memory solved set rather than a NOT IN that would bind
+        every solved code
+        """
         # Does not find problems if you first
         # +update_problems
         # +gimme
         # This is cause calling the /problems api does not return is_organization_private
         # The original goal of is_organization_private filter is to prevent leaking problems
-        conds = [Problem_DB.types.contains(_type) for _type in types]
-        sub_q = (
-            session.query(Submission_DB, func.max(Submission_DB.points))
-            .filter(Submission_DB._user == username)
-            .group_by(Submission_DB._code)
-            .subquery()
-        )
+        conds = [json_contains(Problem_DB.types, _type) for _type in types]
         q = (
-            session.query(Problem_DB)
-            .join(sub_q, Problem_DB.code == sub_q.c._code, isouter=True)
-            .filter(func.ifnull(sub_q.c.points, 0) < Problem_DB.points)
+            session.query(Problem_DB.code)
             .filter(or_(*conds))
             .filter(Problem_DB.points.between(low, high))
-            .filter(Problem_DB.is_organization_private == 0)
-            .filter(Problem_DB.is_public == 1)
+            .filter(Problem_DB.is_organization_private.is_(False))
+            .filter(Problem_DB.is_public.is_(True))
         )
-        return q.all()
+        # solved_cache is keyed by the username as DMOJ spells it
+        canonical = session.query(User_DB.username).filter(func.lower(User_DB.username) == func.lower(username))
+        username = canonical.scalar() or username
+        return [code for (code,) in q if not solved_cache.has_solved(username, code)]
 
     def get_attempted_problems(self, username: str, types: List[str]) -> Problem_DB:
-        conds = [Problem_DB.types.contains(_type) for _type in types]
+        conds = [json_contains(Problem_DB.types, _type) for _type in types]
         sub_q = session.query(Problem_DB).filter(or_(*conds)).subquery()
         q = (
             session.query(func.max(Submission_DB.points))
             .join(sub_q, Submission_DB._code == sub_q.c.code)
             .filter(Submission_DB._user == username)
-            .filter(func.ifnull(Submission_DB.points, 0) != 0)
+            .filter(func.coalesce(Submission_DB.points, 0) != 0)
             .group_by(Submission_DB._code)
         )
         return [point for (point,) in q.all()]
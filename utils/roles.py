@@ -0,0 +1,59 @@
+import hikari
+import typing as t
+from utils.constants import RANKS
+
+
+class RoleIndex:
+    """
+    Per guild name -> role index, kept up to date by the role create/update/delete listeners
+    so commands don't need to convert every role of a guild to find the ones they need
+    """
+
+    def __init__(self):
+        self._roles: t.Dict[int, t.Dict[int, hikari.Role]] = {}
+        self._names: t.Dict[int, t.Dict[str, hikari.Role]] = {}
+
+    def _reindex(self, guild_id: int) -> None:
+        # Discord allows duplicate role names, the first match by id wins like the
+        # postcontest lookup that broke out of its loop over guild.get_roles()
+        names = {}
+        for role_id in sorted(self._roles[guild_id]):
+            role = self._roles[guild_id][role_id]
+            names.setdefault(role.name, role)
+        self._names[guild_id] = names
+
+    def build(self, guild_id: int, roles: t.Iterable[hikari.Role]) -> None:
+        self._roles[guild_id] = {role.id: role for role in roles}
+        self._reindex(guild_id)
+
+    def add(self, role: hikari.Role) -> None:
+        if role.guild_id not in self._roles:
+            # Will be built from the guild cache on first lookup
+            return
+        self._roles[role.guild_id][role.id] = role
+        self._reindex(role.guild_id)
+
+    def remove(self, guild_id: int, role_id: int) -> None:
+        if guild_id not in self._roles:
+            return
+        self._roles[guild_id].pop(role_id, None)
+        self._reindex(guild_id)
+
+    def clear(self, guild_id: int) -> None:
+        self._roles.pop(guild_id, None)
+        self._names.pop(guild_id, None)
+
+    def _get_names(self, guild: hikari.Guild) -> t.Dict[str, hikari.Role]:
+        if guild.id not in self._names:
+            self.build(guild.id, guild.get_roles().values())
+        return self._names[guild.id]
+
+    def get_role(self, guild: hikari.Guild, name: str) -> t.Optional[hikari.Role]:
+        return self._get_names(guild).get(name)
+
+    def get_rank_roles(self, guild: hikari.Guild) -> t.Dict[str, hikari.Role]:
+        names = self._get_names(guild)
+        return {rank: names[rank] for rank in RANKS if rank in names}
+
+
+role_index = RoleIndex()
@@ -0,0 +1,119 @@
+from sqlalchemy import event
+from utils.db import session, Problem as Problem_DB
+import collections
+import heapq
+import math
+import re
+import typing as t
+
+# Fraction of the query's trigrams a problem has to share to be returned
+MIN_SCORE = 0.5
+
+
+def _words(text: str) -> t.List[str]:
+    return re.sub(r"[^0-9a-z]+", " ", text.lower()).split()
+
+
+def trigrams(text: str) -> t.Set[str]:
+    """Trigrams of every word padded like pg_trgm, so word starts weigh more than middles"""
+    grams = set()
+    for word in _words(text):
+        word = "  " + word + " "
+        grams.update(word[i:i + 3] for i in range(len(word) - 2))
+    return grams
+
+
+class ProblemIndex:
+    """
+    In memory trigram index over problem codes and names, built from the problem table on first
+    search and kept in sync by the mapper events below so searches never need the API
+    """
+
+    def __init__(self):
+        self._built = False
+        self._names: t.Dict[str, str] = {}
+        self._grams: t.Dict[str, t.Set[str]] = {}
+        self._postings: t.Dict[str, t.Set[str]] = collections.defaultdict(set)
+
+    def build(self, problems: t.Iterable[t.Tuple[str, str]]) -> None:
+        self.clear()
+        self._built = True
+        for code, name in problems:
+            self.add(code, name)
+
+    def clear(self) -> None:
+        self._built = False
+        self._names.clear()
+        self._grams.clear()
+        self._postings.clear()
+
+    def add(self, code: str, name: str) -> None:
+        if not self._built:
+            # Will be read from the db on first search
+            return
+        self.remove(code)
+        grams = trigrams(code) | trigrams(name or "")
+        self._names[code] = name or ""
+        self._grams[code] = grams
+        for gram in grams:
+            self._postings[gram].add(code)
+
+    def remove(self, code: str) -> None:
+        for gram in self._grams.pop(code, ()):
+            self._postings[gram].discard(code)
+            if not self._postings[gram]:
+                del self._postings[gram]
+        self._names.pop(code, None)
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def search(self, query: str, limit: int = None) -> t.List[str]:
+        """Problem codes best matching query, exact code or name matches first"""
+        if not self._built:
+            self.build(session.query(Problem_DB.code, Problem_DB.name))
+        grams = trigrams(query)
+        if not grams:
+            return []
+        # A problem sharing none of the rarest len(grams) - needed + 1 trigrams can't reach MIN_SCORE,
+        # so only those seed candidates and the common trigrams are just checked against them
+        postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+        needed = max(1, math.ceil(MIN_SCORE * len(grams)))
+        seeds = len(grams) - needed + 1
+        shared = collections.Counter()
+        for posting in postings[:seeds]:
+            shared.update(posting)
+        for posting in postings[seeds:]:
+            for code in shared:
+                if code in posting:
+                    shared[code] += 1
+
+        normalized = " ".join(_words(query))
+        scored = []
+        for code, count in shared.items():
+            score = count / len(grams)
+            if score < MIN_SCORE:
+                continue
+            if code == query.strip().lower():
+                score += 2
+            elif normalized == " ".join(_words(self._names[code])):
+                score += 1
+            # Ties go to the problem with fewer unmatched trigrams, i.e. the shorter name
+            similarity = count / (len(grams) + len(self._grams[code]) - count)
+            scored.append((-score, -similarity, code))
+        scored = sorted(scored) if limit is None else heapq.nsmallest(limit, scored)
+        return [code for _, _, code in scored]
+
+
+problem_index = ProblemIndex()
+
+
+@event.listens_for(Problem_DB, "after_insert")
+@event.listens_for(Problem_DB, "after_update")
+def _index_problem(mapper, connection, target):
+    problem_index.add(target.code, target.name)
+
+
+@event.listens_for(Problem_DB, "after_delete")
+def _unindex_problem(mapper, connection, target):
+    problem_index.remove(target.code)
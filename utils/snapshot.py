@@ -0,0 +1,159 @@
+"""
+Gzipped JSON snapshots of the cached DMOJ catalog, one list per column, so a fresh db can be
+filled with bulk inserts instead of crawling the api
+
+    python -m utils.snapshot export utils/db/seed.json.gz
+    python -m utils.snapshot import utils/db/seed.json.gz
+"""
+import argparse
+import gzip
+import time
+import typing as t
+from datetime import date, datetime
+from sqlalchemy import Date, DateTime, Text, bindparam, select, type_coerce
+from utils.db import (
+    session as db_session,
+    Json,
+    Problem as Problem_DB,
+    Contest as Contest_DB,
+    Language as Language_DB,
+    Organization as Organization_DB,
+    contest_problem,
+    language_problem,
+    organization_problem,
+    contest_organization,
+)
+from utils import codec
+
+VERSION = 1
+# Level 9 spends twice as long for a file a few percent smaller
+COMPRESS_LEVEL = 6
+# Parents before the association tables pointing at them. Contests carry their rankings, users,
+# submissions and anything linked to a discord account are left out
+TABLES = [
+    Problem_DB.__table__,
+    Language_DB.__table__,
+    Organization_DB.__table__,
+    Contest_DB.__table__,
+    contest_problem,
+    language_problem,
+    organization_problem,
+    contest_organization,
+]
+
+
+def _encoder(column):
+    if isinstance(column.type, (Date, DateTime)):
+        return lambda value: value and value.isoformat()
+    if isinstance(column.type, Json):
+        # Selected as text, except postgres hands back jsonb already decoded
+        return lambda value: value if value is None or isinstance(value, str) else codec.dumps(value)
+    return None
+
+
+def _decoder(column):
+    if isinstance(column.type, DateTime):
+        return lambda value: value and datetime.fromisoformat(value)
+    if isinstance(column.type, Date):
+        return lambda value: value and date.fromisoformat(value)
+    return None
+
+
+def _select(table):
+    # Json columns are copied as their text instead of being decoded and encoded again
+    columns = []
+    for column in table.columns:
+        columns.append(type_coerce(column, Text).label(column.name) if isinstance(column.type, Json) else column)
+    return select(columns)
+
+
+def _insert(table):
+    return table.insert().values(
+        {column.name: bindparam(column.name, type_=Text) for column in table.columns if isinstance(column.type, Json)}
+    )
+
+
+def _key_columns(table):
+    # Association tables have no primary key, a row is a duplicate if every column matches
+    return list(table.primary_key.columns) or list(table.columns)
+
+
+def dump(path: str, tables=TABLES, session=db_session) -> t.Dict[str, int]:
+    """Write tables to path, returns the row count of each"""
+    data = {}
+    counts = {}
+    for table in tables:
+        rows = session.execute(_select(table)).fetchall()
+        values = list(zip(*rows)) or [()] * len(table.columns)
+        columns = {}
+        for column, column_values in zip(table.columns, values):
+            encode = _encoder(column)
+            # str() as orjson refuses sqlalchemy's quoted_name keys
+            columns[str(column.name)] = list(map(encode, column_values)) if encode else list(column_values)
+        data[table.name] = columns
+        counts[table.name] = len(rows)
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=COMPRESS_LEVEL) as f:
+        f.write(codec.dumps({"version": VERSION, "tables": data}))
+    return counts
+
+
+def load(path: str, tables=TABLES, session=db_session) -> t.Dict[str, int]:
+    """
+    Insert the rows of tables found in the snapshot at path in one transaction, rows already in the
+    db are skipped. Returns the number of rows inserted into each table
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        snapshot = codec.loads(f.read())
+    if snapshot.get("version") != VERSION:
+        raise ValueError(f"Unsupported snapshot version {snapshot.get('version')}")
+
+    counts = {}
+    try:
+        for table in tables:
+            columns = snapshot["tables"].get(table.name)
+            if columns is None:
+                continue
+            for name, values in columns.items():
+                decode = _decoder(table.columns[name])
+                if decode:
+                    columns[name] = list(map(decode, values))
+
+            keys = [column.name for column in _key_columns(table)]
+            existing = set(map(tuple, session.execute(select(_key_columns(table)))))
+            names = list(columns)
+            rows = []
+            for values in zip(*columns.values()):
+                row = dict(zip(names, values))
+                key = tuple(row.get(name) for name in keys)
+                if key not in existing:
+                    existing.add(key)
+                    rows.append(row)
+            if rows:
+                session.execute(_insert(table), rows)
+            counts[table.name] = len(rows)
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import a snapshot of the cached DMOJ catalog")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("path", help="Snapshot file, gzipped json")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.action == "export":
+        counts = dump(args.path)
+    else:
+        counts = load(args.path)
+    elapsed = time.perf_counter() - start
+    print(f"{args.action.title()}ed {sum(counts.values())} rows in {elapsed:.2f}s")
+    for name, count in counts.items():
+        print(f"{name:>22}: {count}")
+
+
+if __name__ == "__main__":
+    main()
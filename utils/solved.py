@@ -0,0 +1,144 @@
+import time
+from sqlalchemy import func
+from utils.constants import CACHE_TTL
+from utils.db import session, Problem as Problem_DB, User as User_DB, Submission as Submission_DB
+import typing as t
+
+
+class ProblemSet:
+    """
+    Set of problem codes as a bitmap, codes are numbered in the order they are first seen
+    so a user who solved 1000 of 5000 problems takes 625 bytes
+    """
+
+    __slots__ = ("_bits", "_len")
+
+    _numbers: t.Dict[str, int] = {}
+    _codes: t.List[str] = []
+
+    def __init__(self, codes: t.Iterable[str] = ()):
+        self._bits = bytearray()
+        self._len = 0
+        self.update(codes)
+
+    @classmethod
+    def _number(cls, code: str) -> int:
+        number = cls._numbers.get(code)
+        if number is None:
+            number = cls._numbers[code] = len(cls._codes)
+            cls._codes.append(code)
+        return number
+
+    def add(self, code: str) -> None:
+        number = self._number(code)
+        byte, bit = number >> 3, 1 << (number & 7)
+        if byte >= len(self._bits):
+            self._bits.extend(bytes(byte + 1 - len(self._bits)))
+        if not self._bits[byte] & bit:
+            self._bits[byte] |= bit
+            self._len += 1
+
+    def update(self, codes: t.Iterable[str]) -> None:
+        for code in codes:
+            self.add(code)
+
+    def __contains__(self, code: str) -> bool:
+        number = self._numbers.get(code)
+        if number is None or number >> 3 >= len(self._bits):
+            return False
+        return bool(self._bits[number >> 3] & (1 << (number & 7)))
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> t.Iterator[str]:
+        for byte_idx, byte in enumerate(self._bits):
+            if byte:
+                for bit in range(8):
+                    if byte >> bit & 1:
+                        yield self._codes[byte_idx * 8 + bit]
+
+
+class SolvedCache:
+    """
+    Problems each user has fully solved and scored any points on, read from the db on first
+    use and added to as the user and their submissions are fetched. Read again after CACHE_TTL
+    for what other shard processes fetched
+    """
+
+    def __init__(self):
+        # username -> (solved, attempted)
+        self._users: t.Dict[str, t.Tuple[ProblemSet, ProblemSet]] = {}
+        self._built: t.Dict[str, float] = {}
+
+    def build(self, username: str, solved: t.Iterable[str], attempted: t.Iterable[str]) -> None:
+        solved = ProblemSet(solved)
+        attempted = ProblemSet(attempted)
+        attempted.update(solved)
+        self._users[username] = (solved, attempted)
+        self._built[username] = time.monotonic()
+
+    def clear(self, username: str = None) -> None:
+        if username is None:
+            self._users.clear()
+            self._built.clear()
+        else:
+            self._users.pop(username, None)
+            self._built.pop(username, None)
+
+    def _get(self, username: str) -> t.Tuple[ProblemSet, ProblemSet]:
+        if username not in self._users or (CACHE_TTL and time.monotonic() - self._built[username] > CACHE_TTL):
+            # DMOJ's list of fully solved problems, from the last time the user was fetched
+            solved = [
+                code
+                for (code,) in session.query(Problem_DB.code)
+                .join(Problem_DB.solved_users)
+                .filter(User_DB.username == username)
+            ]
+            # And whatever cached submissions say
+            best = (
+                session.query(Submission_DB._code, func.max(Submission_DB.points), Problem_DB.points)
+                .outerjoin(Problem_DB, Problem_DB.code == Submission_DB._code)
+                .filter(Submission_DB._user == username)
+                .group_by(Submission_DB._code, Problem_DB.points)
+            )
+            attempted = []
+            for code, points, total in best:
+                if points:
+                    attempted.append(code)
+                    if total is not None and points >= total:
+                        solved.append(code)
+            self.build(username, solved, attempted)
+        return self._users[username]
+
+    def solved(self, username: str) -> ProblemSet:
+        return self._get(username)[0]
+
+    def attempted(self, username: str) -> ProblemSet:
+        return self._get(username)[1]
+
+    def has_solved(self, username: str, code: str) -> bool:
+        return code in self._get(username)[0]
+
+    def update_user(self, user) -> None:
+        """user is a freshly fetched User_DB"""
+        if user.username not in self._users:
+            # Will be read from the db on first use
+            return
+        codes = [problem.code for problem in user.solved_problems]
+        for problem_set in self._users[user.username]:
+            problem_set.update(codes)
+
+    def add_submissions(self, submissions) -> None:
+        """submissions are api Submissions, with problem set to the Problem_DB"""
+        for submission in submissions:
+            if submission._user not in self._users or not submission.points:
+                continue
+            solved, attempted = self._users[submission._user]
+            attempted.add(submission._problem)
+            problem = submission.problem
+            if problem is not None and problem.points is not None and submission.points >= problem.points:
+                solved.add(submission._problem)
+
+
+solved_cache = SolvedCache()